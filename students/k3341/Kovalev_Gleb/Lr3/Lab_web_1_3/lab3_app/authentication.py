@@ -0,0 +1,71 @@
+"""
+Аутентификация по токену, которая сразу тянет профиль с hotel/staff/client.
+
+Token -> user -> profile -> hotel/staff/client грузятся одним JOIN, после чего
+request.user.profile.* (permissions, admin_hotel, client_obj, ...) в базу не
+ходят. Опционально (AUTH_TOKEN_CACHE_TTL > 0) результат кэшируется по ключу
+токена; записи сбрасываются в signals.py при изменении User/Profile/Token.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import Profile
+
+PROFILE_RELATED = ("hotel", "staff", "client")
+
+
+def _token_cache_key(key: str) -> str:
+    return f"auth-token:{key}"
+
+
+def _cache_ttl() -> int:
+    return getattr(settings, "AUTH_TOKEN_CACHE_TTL", 0)
+
+
+def forget_tokens(*keys):
+    if _cache_ttl() > 0 and keys:
+        cache.delete_many([_token_cache_key(k) for k in keys])
+
+
+def request_profile(request):
+    """
+    Профиль текущего пользователя вместе с hotel/staff/client. Если токен-
+    аутентификация его уже подгрузила — без запросов, иначе один JOIN.
+    """
+    user = request.user
+    if not (user and user.is_authenticated):
+        return None
+
+    rel = type(user).profile.related
+    if not rel.is_cached(user):
+        profile = Profile.objects.select_related(*PROFILE_RELATED).filter(user=user).first()
+        rel.set_cached_value(user, profile)
+    return rel.get_cached_value(user)
+
+
+class ProfileTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        ttl = _cache_ttl()
+        if ttl > 0:
+            cached = cache.get(_token_cache_key(key))
+            if cached is not None:
+                return cached
+
+        token = (
+            Token.objects
+            .select_related("user", *(f"user__profile__{f}" for f in PROFILE_RELATED))
+            .filter(key=key)
+            .first()
+        )
+        if token is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        if ttl > 0:
+            cache.set(_token_cache_key(key), (token.user, token), timeout=ttl)
+        return token.user, token
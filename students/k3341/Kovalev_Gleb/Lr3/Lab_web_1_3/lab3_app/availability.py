@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Booking, Hotel, RoomInHotel, RoomTypeAvailability, TypeOfRoom
+
+CANCELLED = "Отменен"
+CHECKED_OUT = "Выселен"
+CHECKED_IN = "Заселен"
+
+# брони в этих статусах не занимают номер. Единственное определение занятости:
+# по нему считают ensure/recompute/apply_booking_change и verify_availability
+INACTIVE_STATUSES = (CANCELLED, CHECKED_OUT)
+
+
+def daterange(start: date, end: date):
+    cur = start
+    while cur <= end:
+        yield cur
+        cur += timedelta(days=1)
+
+
+def occupancy_by_day(hotel: Hotel, room_type: TypeOfRoom, start: date, end: date):
+    """
+    Занятость по дням на [start..end] одним сгруппированным запросом
+    (брони в INACTIVE_STATUSES не считаются).
+    Брони группируются по (date_start, date_end), дальше +1/-1 на границах
+    интервалов и префиксная сумма. occupied[i] — занятость на start + i дней.
+    """
+    n = (end - start).days + 1
+    deltas = [0] * (n + 1)
+
+    rows = (
+        Booking.objects.filter(
+            hotel=hotel,
+            room_type=room_type,
+            date_start__lte=end,
+            date_end__gte=start,
+        )
+        .exclude(book_status__in=INACTIVE_STATUSES)
+        .values("date_start", "date_end")
+        .annotate(cnt=Count("pk"))
+        .order_by()
+    )
+    for r in rows:
+        lo = max((r["date_start"] - start).days, 0)
+        hi = min((r["date_end"] - start).days, n - 1)
+        deltas[lo] += r["cnt"]
+        deltas[hi + 1] -= r["cnt"]
+
+    occupied = []
+    running = 0
+    for delta in deltas[:n]:
+        running += delta
+        occupied.append(running)
+    return occupied
+
+
+def ensure_availability(hotel: Hotel, room_type: TypeOfRoom, start: date, end: date):
+    """
+    Создаёт недостающие строки доступности по дням на [start..end].
+    free_rooms = total_rooms_in_hotel_for_type - active_bookings_count(day), как в recompute_availability.
+    Недостающие дни ищутся одним запросом, занятость по ним — одним
+    сгруппированным запросом, вставка — одним bulk_create.
+    """
+    existing = set(
+        RoomTypeAvailability.objects
+        .filter(hotel=hotel, room_type=room_type, day__range=(start, end))
+        .values_list("day", flat=True)
+    )
+    missing = [d for d in daterange(start, end) if d not in existing]
+    if not missing:
+        return
+
+    total = RoomInHotel.objects.filter(hotel=hotel, room_type=room_type).count()
+    first, last = missing[0], missing[-1]
+    occupied = occupancy_by_day(hotel, room_type, first, last)
+
+    # ignore_conflicts: параллельный запрос мог успеть вставить те же дни
+    RoomTypeAvailability.objects.bulk_create(
+        [
+            RoomTypeAvailability(
+                hotel=hotel,
+                room_type=room_type,
+                day=d,
+                free_rooms=max(total - occupied[(d - first).days], 0),
+            )
+            for d in missing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def recompute_availability(hotel: Hotel, room_type: TypeOfRoom, start: date, end: date):
+    """
+    Надёжный пересчёт free_rooms по дням на отрезке [start..end].
+    free_rooms = total_rooms - active_bookings_count(day)
+    Активные брони читаются один раз (sweep-line), записываются только
+    изменившиеся дни: один bulk_create для новых и один bulk_update для старых.
+    """
+    total = RoomInHotel.objects.filter(hotel=hotel, room_type=room_type).count()
+    occupied = occupancy_by_day(hotel, room_type, start, end)
+
+    rows = {
+        row.day: row
+        for row in RoomTypeAvailability.objects
+        .filter(hotel=hotel, room_type=room_type, day__range=(start, end))
+        .only("id", "day", "free_rooms")
+    }
+
+    to_create, to_update = [], []
+    for i, d in enumerate(daterange(start, end)):
+        new_free = max(total - occupied[i], 0)
+        row = rows.get(d)
+        if row is None:
+            to_create.append(RoomTypeAvailability(hotel=hotel, room_type=room_type, day=d, free_rooms=new_free))
+        elif row.free_rooms != new_free:
+            row.free_rooms = new_free
+            to_update.append(row)
+
+    if to_create:
+        RoomTypeAvailability.objects.bulk_create(to_create, ignore_conflicts=True)
+    if to_update:
+        RoomTypeAvailability.objects.bulk_update(to_update, ["free_rooms"])
+
+    invalidate_availability(hotel.pk, room_type.pk, start, end)
+
+
+def _contiguous_runs(days):
+    """Отсортированные дни -> список непрерывных отрезков (first, last)."""
+    runs = []
+    for d in sorted(days):
+        if runs and d - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = d
+        else:
+            runs.append([d, d])
+    return [(first, last) for first, last in runs]
+
+
+def _occupied_days(start: date, end: date, book_status: str):
+    if book_status in INACTIVE_STATUSES:
+        return set()
+    return set(daterange(start, end))
+
+
+def apply_booking_change(hotel: Hotel, room_type: TypeOfRoom, old: tuple, new: tuple):
+    """
+    Инкрементальное обновление free_rooms при изменении брони.
+    old/new — (date_start, date_end, book_status) до и после изменения.
+    Трогаем только симметрическую разность занятых дней. Занятые дни —
+    один UPDATE free_rooms = free_rooms - 1 на каждый непрерывный отрезок.
+    Освободившиеся дни нельзя просто +1: на овербукнутом дне free_rooms
+    обрезан нулём, и после снятия брони он всё ещё 0. Поэтому для них
+    занятость читается одним запросом (occupancy_by_day) и пишется
+    max(total - occupied, 0) одним bulk_update.
+    Отсутствующие строки не создаём — ensure_availability посчитает их по броням.
+    Вызывать после сохранения брони: occupancy_by_day читает новое состояние.
+    """
+    old_days = _occupied_days(*old)
+    new_days = _occupied_days(*new)
+
+    taken = new_days - old_days
+    released = old_days - new_days
+
+    rows = RoomTypeAvailability.objects.filter(hotel=hotel, room_type=room_type)
+
+    for first, last in _contiguous_runs(taken):
+        rows.filter(day__range=(first, last), free_rooms__gt=0).update(free_rooms=F("free_rooms") - 1)
+
+    if released:
+        total = RoomInHotel.objects.filter(hotel=hotel, room_type=room_type).count()
+        lo, hi = min(released), max(released)
+        occupied = occupancy_by_day(hotel, room_type, lo, hi)
+
+        to_update = []
+        for row in rows.filter(day__in=released).only("id", "day", "free_rooms"):
+            new_free = max(total - occupied[(row.day - lo).days], 0)
+            if row.free_rooms != new_free:
+                row.free_rooms = new_free
+                to_update.append(row)
+        if to_update:
+            RoomTypeAvailability.objects.bulk_update(to_update, ["free_rooms"])
+
+    changed = taken | released
+    if changed:
+        invalidate_availability(hotel.pk, room_type.pk, min(changed), max(changed))
+
+
+def reserve_room_type(hotel: Hotel, room_type: TypeOfRoom, start: date, end: date) -> bool:
+    """
+    Списывает по одному номеру на каждый день [start..end] одним UPDATE:
+    free_rooms = free_rooms - 1 WHERE day BETWEEN start AND end AND free_rooms > 0.
+    Возвращает False, если затронуто меньше строк, чем ночей (день распродан
+    или строки нет) — тогда вызывающий обязан откатить транзакцию.
+    """
+    nights = (end - start).days + 1
+    updated = (
+        RoomTypeAvailability.objects
+        .filter(hotel=hotel, room_type=room_type, day__range=(start, end), free_rooms__gt=0)
+        .update(free_rooms=F("free_rooms") - 1)
+    )
+    invalidate_availability(hotel.pk, room_type.pk, start, end)
+    return updated == nights
+
+
+def ensure_availability_for_pairs(pairs, start: date, end: date):
+    """
+    pairs — набор (hotel_id, room_type_id). Одним сгруппированным запросом
+    находит пары, у которых на [start..end] не хватает дней, и досоздаёт
+    строки только для них.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+
+    nights = (end - start).days + 1
+    have = {
+        (r["hotel_id"], r["room_type_id"]): r["cnt"]
+        for r in RoomTypeAvailability.objects
+        .filter(hotel_id__in={h for h, _ in pairs}, day__range=(start, end))
+        .values("hotel_id", "room_type_id")
+        .annotate(cnt=Count("id"))
+        .order_by()
+    }
+    incomplete = [p for p in pairs if have.get(p, 0) < nights]
+    if not incomplete:
+        return
+
+    hotels = Hotel.objects.in_bulk({h for h, _ in incomplete})
+    types = TypeOfRoom.objects.in_bulk({t for _, t in incomplete})
+    for hotel_id, type_id in incomplete:
+        ensure_availability(hotels[hotel_id], types[type_id], start, end)
+
+
+# --------------------
+# read-through cache: месячные векторы free_rooms
+# --------------------
+
+def _month_buckets(start: date, end: date):
+    buckets = []
+    y, m = start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        buckets.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return buckets
+
+
+def _cache_key(hotel_id: int, room_type_id: int, bucket) -> str:
+    return f"availability:{hotel_id}:{room_type_id}:{bucket[0]}-{bucket[1]:02d}"
+
+
+def invalidate_availability(hotel_id: int, room_type_id: int, start: date, end: date):
+    """
+    Сбрасывает закэшированные месяцы, задетые отрезком [start..end].
+    Удаляем после коммита, иначе параллельный читатель успеет
+    положить в кэш ещё не изменённые данные.
+    """
+    keys = [_cache_key(hotel_id, room_type_id, b) for b in _month_buckets(start, end)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def cached_free_rooms(hotel: Hotel, room_type: TypeOfRoom, start: date, end: date):
+    """
+    free_rooms по дням [start..end] через кэш (ключ — отель, тип, месяц).
+    Промахнувшиеся месяцы материализуются и читаются одним запросом.
+    Прошедшие дни месяца, кроме запрошенных, не материализуются (их удаляет
+    roll_availability) и лежат в векторе как None; запрос на такой день —
+    тоже промах.
+    """
+    buckets = _month_buckets(start, end)
+    keys = {b: _cache_key(hotel.pk, room_type.pk, b) for b in buckets}
+    vectors = cache.get_many(list(keys.values()))
+
+    missing = sorted({
+        (d.year, d.month)
+        for d in daterange(start, end)
+        if keys[(d.year, d.month)] not in vectors or vectors[keys[(d.year, d.month)]][d.day - 1] is None
+    })
+    if missing:
+        first = max(date(missing[0][0], missing[0][1], 1), min(start, date.today()))
+        last = date(missing[-1][0], missing[-1][1], monthrange(*missing[-1])[1])
+        ensure_availability(hotel, room_type, first, last)
+
+        fresh = {keys[b]: [None] * monthrange(*b)[1] for b in missing}
+        rows = (
+            RoomTypeAvailability.objects
+            .filter(hotel=hotel, room_type=room_type, day__range=(first, last))
+            .values_list("day", "free_rooms")
+        )
+        for d, free in rows:
+            key = keys.get((d.year, d.month))
+            if key in fresh:
+                fresh[key][d.day - 1] = free
+
+        cache.set_many(fresh, timeout=getattr(settings, "AVAILABILITY_CACHE_TTL", 300))
+        vectors.update(fresh)
+
+    return [vectors[keys[(d.year, d.month)]][d.day - 1] for d in daterange(start, end)]
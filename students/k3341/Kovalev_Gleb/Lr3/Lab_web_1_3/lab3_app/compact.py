@@ -0,0 +1,76 @@
+"""
+Компактный режим списков (?compact=1).
+
+Строки собираются из values_list() в плоские dict без DRF-полей, а общие
+объекты (отели, типы номеров) отдаются один раз в боковых таблицах по id.
+"""
+from datetime import date, time
+from decimal import Decimal
+
+from .images import absolute_image_url
+from .models import Hotel, TypeOfRoom
+
+HOTEL_FIELDS = ("id_hotel", "city", "name", "num_of_rooms", "address", "image")
+ROOM_TYPE_FIELDS = ("id_type", "name", "num_of_places", "base_price", "num_of_rooms", "num_of_free_rooms", "image")
+
+# поля с ORM-путями, общие для нескольких списков
+CLIENT_COLUMNS = {
+    "client_id": "client_id",
+    "client_name": "client__name",
+    "client_surname": "client__surname",
+    "client_fathers_name": "client__fathers_name",
+    "client_mobile_number": "client__mobile_number",
+    "client_email": "client__email",
+}
+
+
+def compact_requested(request) -> bool:
+    return (request.query_params.get("compact") or "").lower() in ("1", "true", "yes")
+
+
+def _plain(value):
+    # как у DRF-сериализаторов: Decimal строкой, даты/время в ISO
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def compact_values(qs, columns: dict):
+    """columns — {ключ ответа: ORM-путь}; пагинатору отдаём уже values_list."""
+    return qs.values_list(*columns.values())
+
+
+def compact_rows(rows, columns: dict):
+    """rows — queryset или страница кортежей из compact_values(); на выходе плоские dict."""
+    if hasattr(rows, "values_list"):
+        rows = compact_values(rows, columns)
+    keys = list(columns)
+    return [dict(zip(keys, map(_plain, row))) for row in rows]
+
+
+def _side_table(request, model, fields, ids):
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    table = {}
+    pk = fields[0]
+    for row in model.objects.filter(pk__in=ids).values(*fields):
+        row = {k: _plain(v) for k, v in row.items()}
+        row["image_url"] = absolute_image_url(request, row.pop("image"))
+        table[str(row[pk])] = row
+    return table
+
+
+def side_tables(request, items, hotel_key="hotel_id", room_type_key="room_type_id"):
+    """
+    Боковые таблицы hotels/room_types ({id: объект}) для уже собранных строк,
+    по одному запросу на таблицу. key=None — таблица не нужна.
+    """
+    tables = {}
+    if hotel_key:
+        tables["hotels"] = _side_table(request, Hotel, HOTEL_FIELDS, (i[hotel_key] for i in items))
+    if room_type_key:
+        tables["room_types"] = _side_table(request, TypeOfRoom, ROOM_TYPE_FIELDS, (i[room_type_key] for i in items))
+    return tables
@@ -0,0 +1,48 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+
+def _host(request) -> str:
+    return f"{request.scheme}://{request.get_host()}" if request else ""
+
+
+@lru_cache(maxsize=getattr(settings, "IMAGE_URL_CACHE_SIZE", 1024))
+def _resolve(name: str, host: str, variant: str) -> str:
+    cdn = getattr(settings, "IMAGE_CDN_URL", None)
+    if cdn:
+        url = cdn.rstrip("/") + "/" + name.lstrip("/")
+    else:
+        url = default_storage.url(name)
+        # то же, что request.build_absolute_uri для относительного MEDIA_URL
+        if host and url.startswith("/"):
+            url = host + url
+
+    pattern = getattr(settings, "IMAGE_VARIANTS", {}).get(variant) if variant else None
+    return pattern.format(url=url, name=name) if pattern else url
+
+
+def absolute_image_url(request, image, variant: str = None):
+    """
+    Абсолютный URL картинки с LRU-мемоизацией по (имя в storage, хост, вариант).
+    variant — ключ из settings.IMAGE_VARIANTS (например, thumb), по умолчанию
+    берётся из ?image_variant=... запроса.
+    """
+    if not image:
+        return None
+    name = getattr(image, "name", image)
+    if variant is None and request is not None:
+        variant = request.query_params.get("image_variant") if hasattr(request, "query_params") else None
+    return _resolve(name, _host(request), variant or "")
+
+
+class ImageUrlField(serializers.ImageField):
+    """
+    ImageField, который отдаёт URL через absolute_image_url: без обращения к
+    storage на каждую строку и с учётом IMAGE_CDN_URL. Загрузка — как у ImageField.
+    """
+
+    def to_representation(self, value):
+        return absolute_image_url(self.context.get("request"), value)
@@ -0,0 +1,146 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from lab3_app.availability import CANCELLED, INACTIVE_STATUSES
+from lab3_app.models import Booking, Client, Hotel, RoomInHotel, Staff
+
+
+class Command(BaseCommand):
+    help = (
+        "Show query plans and timings of Booking overlap/admin-list queries without and with Booking.Meta.indexes. "
+        "Everything (synthetic bookings, dropped/created indexes) runs in one transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bookings",
+            type=int,
+            default=100_000,
+            help="Top up BookOfHotel with synthetic bookings up to this many rows (rolled back at the end)",
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query, the best time is reported")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        random.seed(opts["seed"])
+
+        with transaction.atomic():
+            if not self._top_up(opts["bookings"]):
+                return
+
+            pair = (
+                Booking.objects.filter(hotel__isnull=False)
+                .values("hotel_id", "room_type_id")
+                .annotate(cnt=Count("pk"))
+                .order_by("-cnt")
+                .first()
+            )
+            queries = self._queries(pair["hotel_id"], pair["room_type_id"])
+
+            indexes = Booking._meta.indexes
+            with connection.cursor() as cursor:
+                existing = set(connection.introspection.get_constraints(cursor, Booking._meta.db_table))
+
+            # SQL берём у schema editor, но исполняем сами: на SQLite editor
+            # нельзя открыть внутри transaction.atomic(). deferred_sql editor
+            # заводит только в __enter__, а remove_sql его читает
+            editor = connection.schema_editor()
+            editor.deferred_sql = []
+            with connection.cursor() as cursor:
+                for index in indexes:
+                    if index.name in existing:
+                        cursor.execute(str(index.remove_sql(Booking, editor)))
+            before = self._run(queries, opts["repeat"], "BEFORE (no Booking indexes)")
+
+            with connection.cursor() as cursor:
+                for index in indexes:
+                    cursor.execute(str(index.create_sql(Booking, editor)))
+            after = self._run(queries, opts["repeat"], "AFTER (Booking.Meta.indexes)")
+
+            self.stdout.write("")
+            for name in queries:
+                speedup = before[name] / after[name] if after[name] else float("inf")
+                self.stdout.write(self.style.SUCCESS(
+                    f"{name}: {before[name] * 1000:.2f} ms -> {after[name] * 1000:.2f} ms (x{speedup:.1f})"
+                ))
+
+            transaction.set_rollback(True)
+
+    def _top_up(self, target: int) -> bool:
+        have = Booking.objects.count()
+        need = target - have
+        if need <= 0:
+            return True
+
+        hotels = list(Hotel.objects.values_list("id_hotel", flat=True))
+        pairs = list(RoomInHotel.objects.values_list("hotel_id", "room_type_id").distinct())
+        clients = list(Client.objects.values_list("id_client", flat=True))
+        staff = list(Staff.objects.values_list("id_staff", flat=True))
+        if not (hotels and pairs and clients and staff):
+            self.stderr.write(self.style.ERROR("Нужны отели, номера, клиенты и персонал. Сначала запусти seed_fake_data."))
+            return False
+
+        statuses = ["Забронирован", "Ожидает оплату", "Заселен", CANCELLED, "Выселен"]
+        today = date.today()
+
+        self.stdout.write(f"Adding {need} synthetic bookings (have {have})...")
+        batch = []
+        for _ in range(need):
+            hotel_id, type_id = random.choice(pairs)
+            start = today + timedelta(days=random.randint(-365, 365))
+            batch.append(Booking(
+                book_status=random.choice(statuses),
+                date_start=start,
+                date_end=start + timedelta(days=random.randint(0, 10)),
+                client_id=random.choice(clients),
+                staff_id=random.choice(staff),
+                room_type_id=type_id,
+                hotel_id=hotel_id,
+                price=Decimal("1000.00"),
+                payed=Decimal("0.00"),
+                type_of_payment="Карта",
+            ))
+            if len(batch) >= 5000:
+                Booking.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Booking.objects.bulk_create(batch)
+        return True
+
+    def _queries(self, hotel_id: int, type_id: int):
+        start = date.today()
+        end = start + timedelta(days=59)
+        overlap = Booking.objects.filter(hotel_id=hotel_id, room_type_id=type_id, date_start__lte=end, date_end__gte=start)
+        return {
+            "availability overlap (active)": (
+                overlap.exclude(book_status__in=INACTIVE_STATUSES)
+                .values("date_start", "date_end").annotate(cnt=Count("pk")).order_by()
+            ),
+            "admin bookings page": (
+                Booking.objects.filter(hotel_id=hotel_id)
+                .exclude(book_status__in=INACTIVE_STATUSES)
+                .order_by("-id_book")[:10]
+            ),
+        }
+
+    def _run(self, queries, repeat: int, title: str):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{title}"))
+        timings = {}
+        for name, qs in queries.items():
+            self.stdout.write(self.style.MIGRATE_LABEL(f"{name}:"))
+            self.stdout.write(f"  {qs.explain()}")
+            best = None
+            for _ in range(max(repeat, 1)):
+                t0 = time.perf_counter()
+                list(qs.all())
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+            self.stdout.write(f"  best of {repeat}: {best * 1000:.2f} ms")
+        return timings
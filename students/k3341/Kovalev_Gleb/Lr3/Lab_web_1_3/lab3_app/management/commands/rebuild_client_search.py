@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lab3_app.models import Client, ClientSearchToken
+from lab3_app.search import SEARCH_FIELDS, client_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild ClientSearchToken for all clients. Needed after bulk_create/bulk_update of Client, "
+        "which bypass the post_save signal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Clients per iterator/bulk_create chunk")
+
+    def handle(self, *args, **opts):
+        chunk = max(opts["chunk_size"], 1)
+        clients = Client.objects.order_by("id_client").only("id_client", *SEARCH_FIELDS)
+
+        with transaction.atomic():
+            ClientSearchToken.objects.all().delete()
+            batch, total = [], 0
+            for client in clients.iterator(chunk_size=chunk):
+                batch.extend(client_tokens(client))
+                if len(batch) >= chunk:
+                    ClientSearchToken.objects.bulk_create(batch, batch_size=chunk)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                ClientSearchToken.objects.bulk_create(batch, batch_size=chunk)
+                total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Tokens: {total}"))
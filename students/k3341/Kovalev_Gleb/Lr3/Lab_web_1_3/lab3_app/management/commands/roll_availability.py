@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lab3_app.availability import ensure_availability_for_pairs
+from lab3_app.models import Hotel, RoomInHotel, RoomTypeAvailability
+
+
+class Command(BaseCommand):
+    help = "Pre-materialize RoomTypeAvailability for the next N days and prune past days (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365, help="Horizon in days starting from today")
+        parser.add_argument("--hotel", type=int, default=None, help="id_hotel, if not set -> all hotels")
+        parser.add_argument(
+            "--keep-past",
+            type=int,
+            default=0,
+            help="Keep this many past days (0 -> delete everything before today)",
+        )
+        parser.add_argument("--no-prune", action="store_true", help="Do not delete past days")
+
+    def handle(self, *args, **opts):
+        if opts["days"] < 1:
+            self.stderr.write(self.style.ERROR("--days должен быть >= 1"))
+            return
+
+        today = date.today()
+        start, end = today, today + timedelta(days=opts["days"] - 1)
+
+        hotels = Hotel.objects.all()
+        if opts["hotel"]:
+            hotels = hotels.filter(id_hotel=opts["hotel"])
+
+        hotel_ids = list(hotels.values_list("id_hotel", flat=True))
+        if not hotel_ids:
+            self.stderr.write(self.style.ERROR("Отели не найдены."))
+            return
+
+        # пары (отель, тип), в которых реально есть номера
+        pairs = set(
+            RoomInHotel.objects
+            .filter(hotel_id__in=hotel_ids)
+            .values_list("hotel_id", "room_type_id")
+            .distinct()
+        )
+
+        before = RoomTypeAvailability.objects.filter(hotel_id__in=hotel_ids, day__range=(start, end)).count()
+
+        # по отелю на транзакцию: не держим одну огромную блокировку на всю базу
+        for hotel_id in hotel_ids:
+            with transaction.atomic():
+                ensure_availability_for_pairs({p for p in pairs if p[0] == hotel_id}, start, end)
+
+        after = RoomTypeAvailability.objects.filter(hotel_id__in=hotel_ids, day__range=(start, end)).count()
+
+        pruned = 0
+        if not opts["no_prune"]:
+            border = today - timedelta(days=max(opts["keep_past"], 0))
+            pruned, _ = RoomTypeAvailability.objects.filter(hotel_id__in=hotel_ids, day__lt=border).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Horizon {start}..{end}: {len(pairs)} hotel/type pairs, "
+            f"created={after - before}, pruned={pruned}"
+        ))
@@ -1,17 +1,23 @@
+import math
 import random
+import time as timer
+from contextlib import contextmanager
 from datetime import date, timedelta, time
 from decimal import Decimal
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.db import transaction
-from django.utils.timezone import now
+from django.db.models import Count, Q
 
 from lab3_app.models import (
     Hotel, TypeOfRoom, Convenience, ConvenienceType,
-    ContractNumber, Staff, Client, RoomInHotel,
-    Booking, BookingConvenience, CheckIn, CleaningTime, Profile
+    ContractNumber, Staff, Client, ClientSearchToken, RoomInHotel,
+    Booking, BookingConvenience, CheckIn, CleaningTime, Profile, RoomTypeAvailability, RoomTypeDailyRevenue
 )
+from lab3_app.search import client_tokens
 
 User = get_user_model()
 
@@ -21,20 +27,35 @@ LAST_NAMES = ["Иванов", "Петров", "Смирнов", "Кузнецо
 PATRONYMICS = ["Иванович", "Петрович", "Алексеевич", "Сергеевич", "Андреевич", "Дмитриевич", "Олегович", None]
 CITIES = ["Москва", "Санкт-Петербург", "Казань", "Екатеринбург", "Новосибирск", "Самара"]
 
-
-def rand_full_name():
-    fn = random.choice(FIRST_NAMES)
-    ln = random.choice(LAST_NAMES)
-    pt = random.choice(PATRONYMICS)
+# спрос на заезды по месяцам: летний пик и новогодние праздники
+SEASONALITY = {1: 0.8, 2: 0.7, 3: 0.8, 4: 0.9, 5: 1.1, 6: 1.4, 7: 1.6, 8: 1.5, 9: 1.0, 10: 0.8, 11: 0.7, 12: 1.2}
+LEAD_TIME_MEAN_DAYS = 30
+# длина брони (date_end - date_start), короткие чаще
+STAY_NIGHTS = [1, 2, 3, 4, 5, 6, 7]
+STAY_WEIGHTS = [28, 24, 16, 11, 9, 6, 6]
+CANCEL_SHARE = 0.05
+# загрузка самого нагруженного дня, под которую растягивается история (--days-back)
+TARGET_OCCUPANCY = 0.7
+
+
+def rand_full_name(rng):
+    fn = rng.choice(FIRST_NAMES)
+    ln = rng.choice(LAST_NAMES)
+    pt = rng.choice(PATRONYMICS)
     return f"{ln} {fn}" + (f" {pt}" if pt else "")
 
 
-def rand_phone():
-    return f"+7{random.randint(900, 999)}{random.randint(1000000, 9999999)}"
+def rand_phone(rng):
+    return f"+7{rng.randint(900, 999)}{rng.randint(1000000, 9999999)}"
 
 
 class Command(BaseCommand):
-    help = "Seed fake data for hotel system"
+    help = (
+        "Seed fake data for hotel system. Big tables are generated in batches with bulk_create "
+        "(ids kept in memory instead of model objects), so 100 hotels / 1M bookings take minutes. "
+        "Bookings get a hotel and a room without overlaps, RoomTypeAvailability is filled from the same pass "
+        "(consistent on a clean database, see --clear). RoomTypeDailyRevenue is rebuilt at the end."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("--clear", action="store_true", help="Delete existing data before seeding")
@@ -42,9 +63,22 @@ class Command(BaseCommand):
         parser.add_argument("--rooms-per-hotel", type=int, default=18)
         parser.add_argument("--clients", type=int, default=25)
         parser.add_argument("--bookings", type=int, default=30)
+        parser.add_argument("--cleanings", type=int, default=40)
+        parser.add_argument(
+            "--days-back", type=int, default=30,
+            help="Earliest check-in date, days before today (extended if the rooms can't hold --bookings)",
+        )
+        parser.add_argument("--days-ahead", type=int, default=90, help="Latest check-in date and availability horizon")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed: the same seed gives the same data")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk_create")
 
     @transaction.atomic
     def handle(self, *args, **opts):
+        self.rng = random.Random(opts["seed"])
+        self.batch = max(opts["batch_size"], 1)
+        started = timer.perf_counter()
+        self.total_rows = 0
+
         if opts["clear"]:
             self._clear()
 
@@ -59,13 +93,34 @@ class Command(BaseCommand):
         staff = self._seed_staff(contracts, count_admin=opts["hotels"], count_cleaners=opts["hotels"] * 2)
         clients = self._seed_clients(opts["clients"])
 
-        bookings = self._seed_bookings(clients, staff, room_types, opts["bookings"])
-        self._seed_checkins(bookings, rooms)
-        self._seed_cleanings(rooms, staff)
+        occupancy = self._seed_bookings(
+            clients, staff, room_types, rooms, conveniences, opts["bookings"], opts["days_back"], opts["days_ahead"],
+        )
+        self._seed_availability(*occupancy, opts["days_ahead"])
+        self._seed_cleanings(rooms, staff, opts["cleanings"])
 
         self._seed_users_and_profiles(hotels, staff, clients)
+        self._seed_revenue_rollup()
 
-        self.stdout.write(self.style.SUCCESS("✅ Fake data seeded successfully."))
+        elapsed = timer.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Fake data seeded successfully: {self.total_rows} rows in {elapsed:.1f}s "
+            f"({self.total_rows / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
+
+    @contextmanager
+    def _timed(self, label: str):
+        # stats["rows"] заполняет тело блока
+        stats = {"rows": 0}
+        t0 = timer.perf_counter()
+        yield stats
+        elapsed = timer.perf_counter() - t0
+        self.total_rows += stats["rows"]
+        rate = stats["rows"] / elapsed if elapsed else 0
+        self.stdout.write(f"  {label}: {stats['rows']} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+    def _bulk(self, model, objs, **kwargs):
+        return model.objects.bulk_create(objs, batch_size=self.batch, **kwargs)
 
     def _clear(self):
         # Важно: порядок из-за FK/PROTECT
@@ -87,19 +142,24 @@ class Command(BaseCommand):
         self.stdout.write(self.style.WARNING("🧹 Cleared existing data (except superuser)."))
 
     def _seed_hotels(self, n: int):
-        hotels = []
-        for i in range(n):
-            h, _ = Hotel.objects.get_or_create(
-                name=f"Hotel_{i+1}",
-                city=random.choice(CITIES),
-                defaults={
-                    "num_of_rooms": 1,
-                    "address": f"Street {i+1}, {random.randint(1, 99)}",
-                }
-            )
+        with self._timed("hotels") as stats:
+            names = [f"Hotel_{i+1}" for i in range(n)]
+            existing = {h.name: h for h in Hotel.objects.filter(name__in=names)}
             # num_of_rooms уточним после генерации номеров
-            hotels.append(h)
-        return hotels
+            new = [
+                Hotel(
+                    name=name,
+                    city=self.rng.choice(CITIES),
+                    num_of_rooms=1,
+                    address=f"Street {i+1}, {self.rng.randint(1, 99)}",
+                )
+                for i, name in enumerate(names)
+                if name not in existing
+            ]
+            self._bulk(Hotel, new)
+            stats["rows"] = len(new)
+            by_name = {**existing, **{h.name: h for h in new}}
+            return [by_name[name] for name in names]
 
     def _seed_room_types(self):
         # 3 типа из задания: 1/2/3 местные
@@ -139,7 +199,7 @@ class Command(BaseCommand):
     def _seed_convenience_type(self, room_types, conveniences):
         # Привяжем 2-4 удобства к каждому типу
         for rt in room_types:
-            chosen = random.sample(conveniences, k=random.randint(2, min(4, len(conveniences))))
+            chosen = self.rng.sample(conveniences, k=self.rng.randint(2, min(4, len(conveniences))))
             for idx, conv in enumerate(chosen, start=1):
                 ConvenienceType.objects.get_or_create(
                     room_type=rt,
@@ -148,243 +208,387 @@ class Command(BaseCommand):
                 )
 
     def _seed_rooms(self, hotels, room_types, rooms_per_hotel: int):
-        rooms = []
-        for h in hotels:
-            # распределим типы случайно
-            for i in range(rooms_per_hotel):
-                rt = random.choice(room_types)
-                room_number = 100 + i + 1  # 101, 102...
-                room = RoomInHotel.objects.create(
-                    hotel=h,
-                    room_type=rt,
-                    room_number=room_number,
-                    places_number=rt.num_of_places,
-                    status="Свободен",
-                    cleaned=bool(random.getrandbits(1)),
-                )
-                rooms.append(room)
-
-            h.num_of_rooms = rooms_per_hotel
-            h.save(update_fields=["num_of_rooms"])
-
-        # обновим агрегаты в типах (сколько номеров каждого типа)
-        for rt in room_types:
-            total = RoomInHotel.objects.filter(room_type=rt).count()
-            rt.num_of_rooms = max(1, total)
-            rt.num_of_free_rooms = total  # пока всё свободно
-            rt.save(update_fields=["num_of_rooms", "num_of_free_rooms"])
-
-        return rooms
+        """
+        Номера всех отелей одним bulk_create. Занятые номера отелей читаются
+        одним запросом, новые номера раздаются в памяти: 101, 102, ...
+        Возвращает [(id_number, hotel_id, room_type_id)].
+        """
+        with self._timed("rooms") as stats:
+            taken = set(
+                RoomInHotel.objects.filter(hotel__in=hotels).values_list("hotel_id", "room_number")
+            )
+            new = []
+            for h in hotels:
+                number = 100
+                for _ in range(rooms_per_hotel):
+                    number += 1
+                    while (h.pk, number) in taken:
+                        number += 1
+                    # распределим типы случайно
+                    rt = self.rng.choice(room_types)
+                    new.append(RoomInHotel(
+                        hotel=h,
+                        room_type=rt,
+                        room_number=number,
+                        places_number=rt.num_of_places,
+                        status="Свободен",
+                        cleaned=bool(self.rng.getrandbits(1)),
+                    ))
+            self._bulk(RoomInHotel, new)
+            stats["rows"] = len(new)
+
+            for h in hotels:
+                h.num_of_rooms = rooms_per_hotel
+            Hotel.objects.bulk_update(hotels, ["num_of_rooms"], batch_size=self.batch)
+
+            # агрегаты в типах досчитает _seed_bookings, когда будут известны заселения
+            return [(r.pk, r.hotel_id, r.room_type_id) for r in new]
 
     def _seed_contracts(self):
-        contracts = []
-        today = date.today()
-        for i in range(1, 21):
-            start = today - timedelta(days=random.randint(0, 60))
-            end = start + timedelta(days=random.randint(90, 365))
-            c, _ = ContractNumber.objects.get_or_create(
-                contract_number=1000 + i,
-                defaults={
-                    "beginning_of_contract": start,
-                    "end_of_contract": end,
-                    "number_of_job_days": random.randint(18, 26),
-                    "type_of_contract": random.choice(["Постоянный", "Сезонный"]),
-                    "conditions": "Стандартные условия",
-                }
-            )
-            contracts.append(c)
-        return contracts
+        with self._timed("contracts") as stats:
+            today = date.today()
+            new = []
+            for i in range(1, 21):
+                start = today - timedelta(days=self.rng.randint(0, 60))
+                end = start + timedelta(days=self.rng.randint(90, 365))
+                new.append(ContractNumber(
+                    contract_number=1000 + i,
+                    beginning_of_contract=start,
+                    end_of_contract=end,
+                    number_of_job_days=self.rng.randint(18, 26),
+                    type_of_contract=self.rng.choice(["Постоянный", "Сезонный"]),
+                    conditions="Стандартные условия",
+                ))
+            self._bulk(ContractNumber, new, ignore_conflicts=True)
+            stats["rows"] = len(new)
+            return [c.contract_number for c in new]
 
     def _seed_staff(self, contracts, count_admin: int, count_cleaners: int):
-        staff = []
-
-        # Администраторы
-        for i in range(count_admin):
-            s = Staff.objects.create(
-                contract=random.choice(contracts),
-                full_name=rand_full_name(),
-                job_title="Администратор",
+        with self._timed("staff") as stats:
+            titles = (
+                ["Администратор"] * count_admin
+                + ["Уборщик"] * count_cleaners
+                # Техник + охранник
+                + ["Техник"] * 2
+                + ["Охранник"] * 2
             )
-            staff.append(s)
-
-        # Уборщики
-        for i in range(count_cleaners):
-            s = Staff.objects.create(
-                contract=random.choice(contracts),
-                full_name=rand_full_name(),
-                job_title="Уборщик",
-            )
-            staff.append(s)
-
-        # Техник + охранник
-        for title in ["Техник", "Охранник"]:
-            for _ in range(2):
-                s = Staff.objects.create(
-                    contract=random.choice(contracts),
-                    full_name=rand_full_name(),
-                    job_title=title,
-                )
-                staff.append(s)
-
-        return staff
+            staff = [
+                Staff(contract_id=self.rng.choice(contracts), full_name=rand_full_name(self.rng), job_title=title)
+                for title in titles
+            ]
+            self._bulk(Staff, staff)
+            stats["rows"] = len(staff)
+            return staff
 
     def _seed_clients(self, n: int):
-        clients = []
-        for i in range(n):
-            fn = random.choice(FIRST_NAMES)
-            ln = random.choice(LAST_NAMES)
-            pt = random.choice(PATRONYMICS)
-
-            c = Client.objects.create(
-                name=fn,
-                surname=ln,
-                fathers_name=pt,
-                home_adress=f"{random.choice(CITIES)}, ул. {random.randint(1, 50)}, д.{random.randint(1, 120)}",
-                mobile_number=rand_phone(),
-                email=f"user{i+1}@mail.com",
-            )
-            clients.append(c)
-        return clients
-
-    def _seed_bookings(self, clients, staff, room_types, n: int):
-        bookings = []
+        """
+        Клиенты пачками; bulk_create идёт мимо post_save, поэтому токены поиска
+        (ClientSearchToken) пишем тут же. Возвращает список id.
+        """
+        with self._timed("clients") as stats:
+            ids = []
+            for offset in range(0, n, self.batch):
+                batch = []
+                for i in range(offset, min(offset + self.batch, n)):
+                    batch.append(Client(
+                        name=self.rng.choice(FIRST_NAMES),
+                        surname=self.rng.choice(LAST_NAMES),
+                        fathers_name=self.rng.choice(PATRONYMICS),
+                        home_adress=f"{self.rng.choice(CITIES)}, ул. {self.rng.randint(1, 50)}, д.{self.rng.randint(1, 120)}",
+                        mobile_number=rand_phone(self.rng),
+                        email=f"user{i+1}@mail.com",
+                    ))
+                self._bulk(Client, batch)
+                tokens = [t for c in batch for t in client_tokens(c)]
+                self._bulk(ClientSearchToken, tokens)
+                ids.extend(c.pk for c in batch)
+                stats["rows"] += len(batch) + len(tokens)
+            return ids
+
+    def _start_days(self, today: date, days_back: int, days_ahead: int):
+        """
+        Дни заезда и накопленные веса для rng.choices: сезонность по месяцам,
+        пик заездов в пятницу/субботу и затухающий lead time для будущих дат
+        (бронируют чаще на ближайшие недели, чем за полгода).
+        """
+        days, cum, total = [], [], 0.0
+        for offset in range(-days_back, days_ahead + 1):
+            d = today + timedelta(days=offset)
+            w = SEASONALITY[d.month] * (1.3 if d.weekday() in (4, 5) else 1.0)
+            if offset > 0:
+                w *= math.exp(-offset / LEAD_TIME_MEAN_DAYS)
+            total += w
+            days.append(d)
+            cum.append(total)
+        return days, cum
+
+    def _fit_days_back(self, today: date, n: int, rooms: int, days_back: int, days_ahead: int) -> int:
+        """
+        Увеличивает days_back, пока ожидаемая загрузка самого нагруженного дня
+        (n броней * средняя длина * доля заездов в пиковый день) больше
+        TARGET_OCCUPANCY номеров: иначе брони не находят номер и почти все
+        уходят в "Отменен".
+        """
+        mean_days = sum((s + 1) * w for s, w in zip(STAY_NIGHTS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+        while True:
+            _, cum = self._start_days(today, days_back, days_ahead)
+            peak = max(b - a for a, b in zip([0.0] + cum, cum))
+            if n * mean_days * peak / cum[-1] <= rooms * TARGET_OCCUPANCY:
+                return days_back
+            days_back += max(30, days_back // 2)
+
+    def _seed_bookings(self, clients, staff, room_types, rooms, conveniences, n: int, days_back: int, days_ahead: int):
+        """
+        Брони генерируются и пишутся пачками вместе со своими удобствами и
+        заселениями: после bulk_create у броней пачки уже есть pk.
+
+        Каждая активная бронь получает конкретный номер своего отеля: у номера
+        есть битовая карта занятых дней окна, так что ни один день не продан
+        сверх числа номеров. Статус следует из дат: прошлые — "Выселен",
+        идущие сейчас — "Заселен" (номер занят), будущие — "Забронирован" /
+        "Ожидает оплату". Не нашлось номера за несколько попыток — "Отменен";
+        чтобы таких было мало, окно заездов растягивается под число броней
+        (_fit_days_back).
+        Возвращает битовые карты для _seed_availability.
+        """
         today = date.today()
-
-        admins = [s for s in staff if s.job_title == "Администратор"]
-        if not admins:
-            admins = staff[:1]
-
-        for _ in range(n):
-            start = today + timedelta(days=random.randint(-15, 20))
-            end = start + timedelta(days=random.randint(1, 7))
-            rt = random.choice(room_types)
-
-            days = (end - start).days + 1
-            price = Decimal(days * rt.base_price)
-
-            status = random.choice(["Ожидает оплату", "Забронирован"])
-            payed = Decimal("0.00")
-            if status == "Забронирован":
-                # часть оплачена полностью
-                payed = price if random.random() < 0.6 else price * Decimal("0.5")
-
-            b = Booking.objects.create(
-                book_status=status,
-                date_start=start,
-                date_end=end,
-                client=random.choice(clients),
-                staff=random.choice(admins),
-                room_type=rt,
-                price=price,
-                payed=payed,
-                type_of_payment=random.choice(["Карта", "СБП", "Наличные"]),
-            )
-
-            # добавим 0-2 доп. удобства
-            convs = list(Convenience.objects.all())
-            if convs and random.random() < 0.5:
-                for conv in random.sample(convs, k=random.randint(0, min(2, len(convs)))):
-                    BookingConvenience.objects.get_or_create(booking=b, convenience=conv)
-
-            bookings.append(b)
-
-        return bookings
-
-    def _seed_checkins(self, bookings, rooms):
-        # заселим часть броней, подбирая свободный номер нужного типа
+        types = {rt.pk: rt for rt in room_types}
+        admins = [s.pk for s in staff if s.job_title == "Администратор"] or [staff[0].pk]
+        conv_ids = [c.pk for c in conveniences]
+
+        fitted = self._fit_days_back(today, n, len(rooms), days_back, days_ahead)
+        if fitted != days_back:
+            self.stdout.write(self.style.WARNING(
+                f"  --days-back {days_back} is too short for {n} bookings on {len(rooms)} rooms, using {fitted}"
+            ))
+            days_back = fitted
+
+        starts, cum_weights = self._start_days(today, days_back, days_ahead)
+        window_start = starts[0]
+        window_len = (starts[-1] - window_start).days + max(STAY_NIGHTS) + 1
+
+        pair_rooms = {}
+        for room_id, hotel_id, type_id in rooms:
+            pair_rooms.setdefault((hotel_id, type_id), []).append(room_id)
+        busy_days = {room_id: bytearray(window_len) for room_id, _, _ in rooms}
+        in_house = []
+        cancelled = 0
+
+        def find_room(pair, a, b):
+            for room_id in pair_rooms[pair]:
+                if busy_days[room_id].find(1, a, b) == -1:
+                    return room_id
+            return None
+
+        with self._timed("bookings + conveniences + checkins") as stats:
+            for offset in range(0, n, self.batch):
+                bookings, rooms_for = [], []
+                for _ in range(min(self.batch, n - offset)):
+                    # пара (отель, тип) пропорционально числу номеров
+                    _, hotel_id, type_id = self.rng.choice(rooms)
+                    rt = types[type_id]
+                    nights = self.rng.choices(STAY_NIGHTS, weights=STAY_WEIGHTS)[0]
+
+                    room_id = None
+                    for _attempt in range(3):
+                        start = self.rng.choices(starts, cum_weights=cum_weights)[0]
+                        end = start + timedelta(days=nights)
+                        a = (start - window_start).days
+                        room_id = find_room((hotel_id, type_id), a, a + nights + 1)
+                        if room_id is not None:
+                            break
+
+                    days = (end - start).days + 1
+                    price = Decimal(days * rt.base_price)
+                    payed = Decimal("0.00")
+
+                    if room_id is None or self.rng.random() < CANCEL_SHARE:
+                        status, room_id = "Отменен", None
+                        cancelled += 1
+                    elif end < today:
+                        status, payed = "Выселен", price
+                    elif start <= today:
+                        status = "Заселен"
+                        payed = price if self.rng.random() < 0.8 else price * Decimal("0.5")
+                    else:
+                        status = self.rng.choice(["Ожидает оплату", "Забронирован"])
+                        if status == "Забронирован":
+                            # часть оплачена полностью
+                            payed = price if self.rng.random() < 0.6 else price * Decimal("0.5")
+
+                    if room_id is not None:
+                        a = (start - window_start).days
+                        busy_days[room_id][a:a + nights + 1] = b"\x01" * (nights + 1)
+
+                    bookings.append(Booking(
+                        book_status=status,
+                        date_start=start,
+                        date_end=end,
+                        client_id=self.rng.choice(clients),
+                        staff_id=self.rng.choice(admins),
+                        room_type_id=type_id,
+                        hotel_id=hotel_id,
+                        price=price,
+                        payed=payed,
+                        type_of_payment=self.rng.choice(["Карта", "СБП", "Наличные"]),
+                    ))
+                    rooms_for.append(room_id)
+
+                self._bulk(Booking, bookings)
+
+                extras, checkins = [], []
+                for b, room_id in zip(bookings, rooms_for):
+                    # добавим 0-2 доп. удобства
+                    if conv_ids and self.rng.random() < 0.5:
+                        for conv_id in self.rng.sample(conv_ids, k=self.rng.randint(0, min(2, len(conv_ids)))):
+                            extras.append(BookingConvenience(booking_id=b.pk, convenience_id=conv_id))
+                    if b.book_status in ("Заселен", "Выселен"):
+                        # checkin на интервал брони в назначенный номер
+                        checkins.append(CheckIn(
+                            date_check_in=b.date_start,
+                            date_check_out=b.date_end,
+                            client_id=b.client_id,
+                            room_id=room_id,
+                            staff_id=b.staff_id,
+                            booking_id=b.pk,
+                        ))
+                        if b.book_status == "Заселен":
+                            in_house.append(room_id)
+
+                self._bulk(BookingConvenience, extras)
+                self._bulk(CheckIn, checkins)
+                stats["rows"] += len(bookings) + len(extras) + len(checkins)
+
+            # номера, где сейчас живут, заняты и не убраны
+            for i in range(0, len(in_house), self.batch):
+                RoomInHotel.objects.filter(pk__in=in_house[i:i + self.batch]).update(status="Занят", cleaned=False)
+
+        share = cancelled / n if n else 0
+        style = self.style.WARNING if share > 2 * CANCEL_SHARE else str
+        self.stdout.write(style(f"  cancelled bookings: {cancelled} of {n} ({share:.1%})"))
+
+        # агрегаты в типах (сколько номеров каждого типа и сколько свободно) одним запросом
+        counts = {
+            r["room_type_id"]: r
+            for r in RoomInHotel.objects.values("room_type_id")
+            .annotate(total=Count("id_number"), busy=Count("id_number", filter=Q(status="Занят")))
+            .order_by()
+        }
+        for rt in room_types:
+            c = counts.get(rt.pk, {"total": 0, "busy": 0})
+            rt.num_of_rooms = max(1, c["total"])
+            rt.num_of_free_rooms = min(c["total"] - c["busy"], rt.num_of_rooms)
+        TypeOfRoom.objects.bulk_update(room_types, ["num_of_rooms", "num_of_free_rooms"])
+
+        return pair_rooms, busy_days, window_start
+
+    def _seed_availability(self, pair_rooms, busy_days, window_start: date, days_ahead: int):
+        """
+        RoomTypeAvailability на [сегодня..сегодня + days_ahead] прямо из битовых
+        карт номеров: free_rooms = номеров пары без брони в этот день. Совпадает
+        с тем, что посчитал бы recompute_availability по только что созданным броням.
+        """
         today = date.today()
-
-        for b in bookings:
-            if random.random() > 0.45:
-                continue
-
-            # выберем свободную комнату соответствующего типа
-            candidates = [r for r in rooms if r.room_type_id == b.room_type_id and r.status == "Свободен"]
-            if not candidates:
-                continue
-
-            room = random.choice(candidates)
-
-            # создаём checkin на интервал брони
-            CheckIn.objects.create(
-                date_check_in=b.date_start,
-                date_check_out=b.date_end,
-                client=b.client,
-                room=room,
-                staff=b.staff,
-                booking=b,
-            )
-
-            # обновим комнату + free_rooms счетчики
-            room.status = "Занят"
-            room.cleaned = False
-            room.save(update_fields=["status", "cleaned"])
-
-            b.book_status = "Заселен"
-            b.save(update_fields=["book_status"])
-
-            rt = b.room_type
-            rt.num_of_free_rooms = max(0, rt.num_of_free_rooms - 1)
-            rt.save(update_fields=["num_of_free_rooms"])
-
-    def _seed_cleanings(self, rooms, staff):
-        cleaners = [s for s in staff if s.job_title == "Уборщик"]
-        if not cleaners:
+        lo = (today - window_start).days
+
+        with self._timed("availability") as stats:
+            batch = []
+            for (hotel_id, type_id), room_ids in pair_rooms.items():
+                maps = [busy_days[r] for r in room_ids]
+                for i in range(days_ahead + 1):
+                    busy = sum(m[lo + i] for m in maps)
+                    batch.append(RoomTypeAvailability(
+                        hotel_id=hotel_id, room_type_id=type_id,
+                        day=today + timedelta(days=i), free_rooms=len(maps) - busy,
+                    ))
+                if len(batch) >= self.batch:
+                    self._upsert_availability(batch)
+                    stats["rows"] += len(batch)
+                    batch = []
+            self._upsert_availability(batch)
+            stats["rows"] += len(batch)
+
+    def _upsert_availability(self, rows):
+        self._bulk(
+            RoomTypeAvailability, rows,
+            update_conflicts=True, unique_fields=["hotel", "room_type", "day"], update_fields=["free_rooms"],
+        )
+
+    def _seed_revenue_rollup(self):
+        # bulk_create идёт мимо refresh_revenue_rollup во вьюхах: без этого
+        # квартальный отчёт на свежей базе — одни нули
+        with self._timed("revenue rollup") as stats:
+            call_command("rebuild_revenue_rollup", batch_size=self.batch, stdout=self.stdout)
+            stats["rows"] = RoomTypeDailyRevenue.objects.count()
+
+    def _seed_cleanings(self, rooms, staff, n: int):
+        cleaners = [s.pk for s in staff if s.job_title == "Уборщик"]
+        if not cleaners or not rooms:
             return
 
-        today = date.today()
-        # сделаем уборки за последние 5 дней
-        for _ in range(40):
-            room = random.choice(rooms)
-            d = today - timedelta(days=random.randint(0, 5))
-            t = time(hour=random.randint(9, 18), minute=random.choice([0, 15, 30, 45]))
-
-            CleaningTime.objects.update_or_create(
-                room=room,
-                date=d,
-                defaults={
-                    "staff": random.choice(cleaners),
-                    "cleaning_time": t,
-                    "cleaning_status": random.choice(["Убран", "Не убран"]),
-                }
-            )
+        with self._timed("cleanings") as stats:
+            today = date.today()
+            # сделаем уборки за последние 5 дней; (room, date) уникальны
+            n = min(n, len(rooms) * 6)
+            seen, batch = set(), []
+            while len(seen) < n:
+                room_id = self.rng.choice(rooms)[0]
+                d = today - timedelta(days=self.rng.randint(0, 5))
+                if (room_id, d) in seen:
+                    continue
+                seen.add((room_id, d))
+                batch.append(CleaningTime(
+                    room_id=room_id,
+                    date=d,
+                    staff_id=self.rng.choice(cleaners),
+                    cleaning_time=time(hour=self.rng.randint(9, 18), minute=self.rng.choice([0, 15, 30, 45])),
+                    cleaning_status=self.rng.choice(["Убран", "Не убран"]),
+                ))
+                if len(batch) >= self.batch:
+                    self._bulk(CleaningTime, batch, ignore_conflicts=True)
+                    batch = []
+            self._bulk(CleaningTime, batch, ignore_conflicts=True)
+            stats["rows"] = len(seen)
 
     def _seed_users_and_profiles(self, hotels, staff, clients):
-        # admin user per hotel
-        for idx, h in enumerate(hotels, start=1):
-            username = f"admin{idx}"
-            u = User.objects.filter(username=username).first()
-            if not u:
-                u = User.objects.create_user(username=username, password="admin12345")
-            prof, _ = Profile.objects.get_or_create(user=u)
-            prof.role = Profile.Role.ADMIN
-            prof.hotel = h
-            prof.client = None
-            prof.save()
-
-        # cleaner users (2)
-        for idx in range(1, 3):
-            username = f"cleaner{idx}"
-            u = User.objects.filter(username=username).first()
-            if not u:
-                u = User.objects.create_user(username=username, password="cleaner12345")
-            prof, _ = Profile.objects.get_or_create(user=u)
-            prof.role = Profile.Role.CLEANER
-            prof.hotel = random.choice(hotels)
-            prof.client = None
-            prof.save()
-
-        # one client user linked to Client
-        username = "client1"
-        u = User.objects.filter(username=username).first()
-        if not u:
-            u = User.objects.create_user(username=username, password="client12345")
-        prof, _ = Profile.objects.get_or_create(user=u)
-        prof.role = Profile.Role.CLIENT
-        prof.hotel = None
-        prof.client = random.choice(clients)
-        prof.save()
+        """
+        Пользователи одним bulk_create: пароль хэшируется один раз на роль,
+        профили (обычно их создаёт post_save) тоже пишутся пачкой.
+        """
+        # admin user per hotel, cleaner users (2), one client user linked to Client
+        wanted = [(f"admin{idx}", "admin12345", Profile.Role.ADMIN, h, None) for idx, h in enumerate(hotels, start=1)]
+        wanted += [
+            (f"cleaner{idx}", "cleaner12345", Profile.Role.CLEANER, self.rng.choice(hotels), None)
+            for idx in range(1, 3)
+        ]
+        wanted.append(("client1", "client12345", Profile.Role.CLIENT, None, self.rng.choice(clients)))
+
+        with self._timed("users + profiles") as stats:
+            users = User.objects.in_bulk([w[0] for w in wanted], field_name="username")
+            hashes = {}
+            new_users = []
+            for username, password, *_ in wanted:
+                if username not in users:
+                    if password not in hashes:
+                        hashes[password] = make_password(password)
+                    new_users.append(User(username=username, password=hashes[password]))
+            self._bulk(User, new_users)
+            users.update({u.username: u for u in new_users})
+
+            profiles = Profile.objects.in_bulk([users[w[0]].pk for w in wanted], field_name="user_id")
+            for username, _, role, hotel, client_id in wanted:
+                user = users[username]
+                prof = profiles.get(user.pk) or Profile(user=user)
+                prof.role = role
+                prof.hotel = hotel
+                prof.client_id = client_id
+                profiles[user.pk] = prof
+
+            existing = [p for p in profiles.values() if p.pk is not None]
+            self._bulk(Profile, [p for p in profiles.values() if p.pk is None])
+            Profile.objects.bulk_update(existing, ["role", "hotel", "client"])
+            stats["rows"] = len(new_users) + len(profiles)
 
         self.stdout.write(self.style.SUCCESS(
             "Created users: admin1..adminN (admin12345), cleaner1..2 (cleaner12345), client1 (client12345)"
-        ))
\ No newline at end of file
+        ))
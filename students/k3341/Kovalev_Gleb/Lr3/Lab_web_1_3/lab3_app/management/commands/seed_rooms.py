@@ -1,6 +1,8 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.db.models import Max
+from django.db import connection, transaction
 
 from lab3_app.models import Hotel, TypeOfRoom, RoomInHotel
 
@@ -28,44 +30,92 @@ class Command(BaseCommand):
             help="Default status for created rooms",
         )
         parser.add_argument("--cleaned", action="store_true", help="Set cleaned=True for created rooms")
+        parser.add_argument("--chunk-size", type=int, default=20, help="Hotels per chunk (one read + one bulk insert)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Parallel chunks on PostgreSQL (each in its own transaction); other backends run sequentially",
+        )
 
-    @transaction.atomic
     def handle(self, *args, **opts):
         hotels = Hotel.objects.all()
         if opts["hotel"]:
             hotels = hotels.filter(id_hotel=opts["hotel"])
 
-        if not hotels.exists():
+        hotel_ids = list(hotels.order_by("id_hotel").values_list("id_hotel", flat=True))
+        if not hotel_ids:
             self.stderr.write(self.style.ERROR("Отели не найдены."))
             return
 
-        types = list(TypeOfRoom.objects.all().order_by("id_type"))
-        if not types:
+        self.types = list(TypeOfRoom.objects.all().order_by("id_type"))
+        if not self.types:
             self.stderr.write(self.style.ERROR("В базе нет TypeOfRoom. Сначала создай типы номеров."))
             return
 
-        status = opts["status"]
-        cleaned = bool(opts["cleaned"])
-        only_missing = bool(opts["only_missing"])
+        self.opts = opts
+        size = max(opts["chunk_size"], 1)
+        chunks = [hotel_ids[i:i + size] for i in range(0, len(hotel_ids), size)]
 
-        total_created = 0
+        # параллельно только на PostgreSQL: SQLite всё равно сериализует запись
+        workers = max(opts["workers"], 1) if connection.vendor == "postgresql" else 1
+        if workers > 1 and len(chunks) > 1:
+            # у каждого потока своё соединение и своя транзакция на чанк
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self._provision_in_thread, chunks))
+        else:
+            with transaction.atomic():
+                results = [self._provision(chunk) for chunk in chunks]
 
-        for hotel in hotels:
+        total_created = 0
+        for chunk_result in results:
+            for hotel_id, name, created_for_hotel in chunk_result:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Hotel {hotel_id} ({name}): created {created_for_hotel} rooms"
+                ))
+                total_created += created_for_hotel
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Total created={total_created}"))
+
+    def _provision_in_thread(self, hotel_ids):
+        try:
+            with transaction.atomic():
+                return self._provision(hotel_ids)
+        finally:
+            connection.close()
+
+    def _provision(self, hotel_ids):
+        """
+        Номера для чанка отелей: занятые номера (и число номеров по типам) читаются
+        одним запросом на чанк, новые номера раздаются в памяти, вставка —
+        bulk_create. Возвращает [(id_hotel, name, created)].
+        """
+        status = self.opts["status"]
+        cleaned = bool(self.opts["cleaned"])
+        only_missing = bool(self.opts["only_missing"])
+
+        names = dict(Hotel.objects.filter(id_hotel__in=hotel_ids).values_list("id_hotel", "name"))
+
+        numbers = defaultdict(set)
+        already = defaultdict(int)
+        for hotel_id, type_id, number in RoomInHotel.objects.filter(hotel_id__in=hotel_ids).values_list(
+            "hotel_id", "room_type_id", "room_number"
+        ):
+            numbers[hotel_id].add(number)
+            already[(hotel_id, type_id)] += 1
+
+        rooms, result = [], []
+        for hotel_id in hotel_ids:
+            taken = numbers[hotel_id]
             # старт номера: max(room_number)+1 или start-number/1
-            mx = RoomInHotel.objects.filter(hotel=hotel).aggregate(m=Max("room_number"))["m"]
-            if mx is not None:
-                next_number = mx + 1
-            else:
-                next_number = int(opts["start_number"] or 1)
+            next_number = max(taken) + 1 if taken else int(self.opts["start_number"] or 1)
 
             created_for_hotel = 0
-
-            for t in types:
+            for t in self.types:
                 target = int(t.num_of_rooms)
 
                 if only_missing:
-                    already = RoomInHotel.objects.filter(hotel=hotel, room_type=t).count()
-                    need = max(target - already, 0)
+                    need = max(target - already[(hotel_id, t.id_type)], 0)
                 else:
                     # создаём ровно target, даже если уже есть (может привести к дубликатам по типу)
                     # поэтому лучше использовать only_missing
@@ -73,23 +123,22 @@ class Command(BaseCommand):
 
                 for _ in range(need):
                     # гарантируем уникальность room_number в отеле
-                    while RoomInHotel.objects.filter(hotel=hotel, room_number=next_number).exists():
+                    while next_number in taken:
                         next_number += 1
 
-                    RoomInHotel.objects.create(
-                        hotel=hotel,
+                    rooms.append(RoomInHotel(
+                        hotel_id=hotel_id,
                         room_type=t,
                         room_number=next_number,
                         places_number=t.num_of_places,
                         status=status,
                         cleaned=cleaned,
-                    )
+                    ))
+                    taken.add(next_number)
                     next_number += 1
                     created_for_hotel += 1
 
-            self.stdout.write(self.style.SUCCESS(
-                f"Hotel {hotel.id_hotel} ({hotel.name}): created {created_for_hotel} rooms"
-            ))
-            total_created += created_for_hotel
+            result.append((hotel_id, names[hotel_id], created_for_hotel))
 
-        self.stdout.write(self.style.SUCCESS(f"Done. Total created={total_created}"))
\ No newline at end of file
+        RoomInHotel.objects.bulk_create(rooms, batch_size=1000)
+        return result
@@ -0,0 +1,188 @@
+import heapq
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from lab3_app.availability import CHECKED_IN, INACTIVE_STATUSES, invalidate_availability
+from lab3_app.models import Booking, CheckIn, RoomInHotel, RoomTypeAvailability, TypeOfRoom
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify RoomTypeAvailability.free_rooms, RoomInHotel.status and TypeOfRoom.num_of_free_rooms "
+        "against Booking/CheckIn and optionally repair them (--fix)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Write recomputed values with bulk_update")
+        parser.add_argument("--hotel", type=int, default=None, help="id_hotel, if not set -> all hotels")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows per iterator/bulk_update chunk")
+        parser.add_argument("--show", type=int, default=20, help="How many mismatches to print per check")
+
+    def handle(self, *args, **opts):
+        self.fix = opts["fix"]
+        self.chunk = max(opts["chunk_size"], 1)
+        self.show = opts["show"]
+        self.hotel_id = opts["hotel"]
+
+        with transaction.atomic():
+            days_bad = self._verify_days()
+            rooms_bad = self._verify_room_statuses()
+            types_bad = self._verify_type_counters()
+
+        total = days_bad + rooms_bad + types_bad
+        verb = "fixed" if self.fix else "found"
+        style = self.style.SUCCESS if not total or self.fix else self.style.WARNING
+        self.stdout.write(style(
+            f"Done. Mismatches {verb}: availability days={days_bad}, room statuses={rooms_bad}, "
+            f"room types={types_bad}"
+        ))
+
+    def _report(self, shown, line):
+        if shown < self.show:
+            self.stdout.write(f"  {line}")
+
+    # ---------- RoomTypeAvailability ----------
+
+    def _verify_days(self):
+        """
+        Один потоковый проход: дни и активные брони читаются двумя курсорами,
+        отсортированными по (hotel, room_type, day/date_start). Для текущей пары
+        держим только кучу концов открытых броней, так что память не зависит
+        от числа строк.
+        """
+        rooms = RoomInHotel.objects.all()
+        days = RoomTypeAvailability.objects.all()
+        bookings = Booking.objects.filter(hotel__isnull=False).exclude(book_status__in=INACTIVE_STATUSES)
+        if self.hotel_id:
+            rooms = rooms.filter(hotel_id=self.hotel_id)
+            days = days.filter(hotel_id=self.hotel_id)
+            bookings = bookings.filter(hotel_id=self.hotel_id)
+
+        totals = {
+            (r["hotel_id"], r["room_type_id"]): r["cnt"]
+            for r in rooms.values("hotel_id", "room_type_id").annotate(cnt=Count("id_number")).order_by()
+        }
+
+        day_rows = (
+            days.order_by("hotel_id", "room_type_id", "day")
+            .values_list("id", "hotel_id", "room_type_id", "day", "free_rooms")
+            .iterator(chunk_size=self.chunk)
+        )
+        booking_rows = (
+            bookings.order_by("hotel_id", "room_type_id", "date_start")
+            .values_list("hotel_id", "room_type_id", "date_start", "date_end")
+            .iterator(chunk_size=self.chunk)
+        )
+
+        pending = next(booking_rows, None)
+        pair, open_ends = None, []
+        to_update, touched = [], {}
+        bad = 0
+
+        for row_id, hotel_id, type_id, day, free in day_rows:
+            if (hotel_id, type_id) != pair:
+                pair, open_ends = (hotel_id, type_id), []
+
+            # подтягиваем брони, начавшиеся не позже этого дня
+            while pending is not None and (pending[0], pending[1]) < pair:
+                pending = next(booking_rows, None)
+            while pending is not None and (pending[0], pending[1]) == pair and pending[2] <= day:
+                heapq.heappush(open_ends, pending[3])
+                pending = next(booking_rows, None)
+
+            # и выкидываем закончившиеся
+            while open_ends and open_ends[0] < day:
+                heapq.heappop(open_ends)
+
+            expected = max(totals.get(pair, 0) - len(open_ends), 0)
+            if free == expected:
+                continue
+
+            self._report(bad, f"hotel={hotel_id} type={type_id} day={day}: free_rooms={free}, expected={expected}")
+            bad += 1
+
+            if self.fix:
+                to_update.append(RoomTypeAvailability(id=row_id, free_rooms=expected))
+                lo, hi = touched.get(pair, (day, day))
+                touched[pair] = (min(lo, day), max(hi, day))
+                if len(to_update) >= self.chunk:
+                    RoomTypeAvailability.objects.bulk_update(to_update, ["free_rooms"])
+                    to_update = []
+
+        if to_update:
+            RoomTypeAvailability.objects.bulk_update(to_update, ["free_rooms"])
+        for (hotel_id, type_id), (lo, hi) in touched.items():
+            invalidate_availability(hotel_id, type_id, lo, hi)
+
+        return bad
+
+    # ---------- RoomInHotel.status ----------
+
+    def _occupied_rooms(self):
+        # номер занят, если по нему есть заселение с бронью в статусе "Заселен"
+        return RoomInHotel.objects.annotate(
+            occupied=Exists(CheckIn.objects.filter(room=OuterRef("pk"), booking__book_status=CHECKED_IN))
+        )
+
+    def _verify_room_statuses(self):
+        rooms = self._occupied_rooms()
+        if self.hotel_id:
+            rooms = rooms.filter(hotel_id=self.hotel_id)
+
+        rows = (
+            rooms.order_by("id_number")
+            .values_list("id_number", "hotel_id", "room_number", "status", "occupied")
+            .iterator(chunk_size=self.chunk)
+        )
+
+        to_update, bad = [], 0
+        for room_id, hotel_id, number, current, occupied in rows:
+            expected = "Занят" if occupied else "Свободен"
+            if current == expected:
+                continue
+
+            self._report(bad, f"hotel={hotel_id} room #{number}: status={current}, expected={expected}")
+            bad += 1
+
+            if self.fix:
+                to_update.append(RoomInHotel(id_number=room_id, status=expected))
+                if len(to_update) >= self.chunk:
+                    RoomInHotel.objects.bulk_update(to_update, ["status"])
+                    to_update = []
+
+        if to_update:
+            RoomInHotel.objects.bulk_update(to_update, ["status"])
+        return bad
+
+    # ---------- TypeOfRoom.num_of_free_rooms ----------
+
+    def _verify_type_counters(self):
+        # счётчик глобальный по всем отелям, поэтому --hotel здесь не применяется
+        counts = {
+            r["room_type_id"]: r
+            for r in self._occupied_rooms()
+            .values("room_type_id")
+            .annotate(total=Count("id_number"), busy=Count("id_number", filter=Q(occupied=True)))
+            .order_by()
+        }
+
+        to_update, bad = [], 0
+        for t in TypeOfRoom.objects.only("id_type", "name", "num_of_rooms", "num_of_free_rooms").order_by("id_type"):
+            c = counts.get(t.id_type, {"total": 0, "busy": 0})
+            # CheckConstraint: num_of_free_rooms <= num_of_rooms
+            expected = min(c["total"] - c["busy"], t.num_of_rooms)
+            if t.num_of_free_rooms == expected:
+                continue
+
+            self._report(bad, f"type={t.id_type} ({t.name}): num_of_free_rooms={t.num_of_free_rooms}, expected={expected}")
+            bad += 1
+
+            if self.fix:
+                t.num_of_free_rooms = expected
+                to_update.append(t)
+
+        if to_update:
+            TypeOfRoom.objects.bulk_update(to_update, ["num_of_free_rooms"])
+        return bad
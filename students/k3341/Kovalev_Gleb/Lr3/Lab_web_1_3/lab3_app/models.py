@@ -158,6 +158,31 @@ class Client(models.Model):
         return f"{self.surname} {self.name}"
 
 
+class ClientSearchToken(models.Model):
+    """
+    Нормализованные токены клиента (имя, фамилия, отчество, email) для
+    поиска по префиксу индексом вместо icontains. Заполняется в signals.py.
+    """
+    id = models.BigAutoField(primary_key=True)
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = "ClientSearchToken"
+        constraints = [
+            models.UniqueConstraint(fields=["client", "token"], name="uq_client_token"),
+        ]
+        indexes = [
+            # (token, client) — покрывающий индекс для range-скана по префиксу.
+            # LIKE 'префикс%' на PostgreSQL идёт по btree только с pattern_ops
+            # (при любой collation); на других базах opclasses игнорируются
+            models.Index(
+                fields=["token", "client"], name="idx_client_token",
+                opclasses=["varchar_pattern_ops", "int4_ops"],
+            ),
+        ]
+
+
 class RoomInHotel(models.Model):
     STATUSES = [
         ("Свободен", "Свободен"),
@@ -277,6 +302,17 @@ class Booking(models.Model):
             models.CheckConstraint(check=Q(date_start__lte=F("date_end")), name="chk_booking_start_le_end"),
             models.CheckConstraint(check=Q(payed__lte=F("price")), name="chk_booking_payed_lte_price"),
         ]
+        indexes = [
+            # пересечение брони с периодом по (отель, тип): ensure/recompute availability, verify
+            models.Index(fields=["hotel", "room_type", "date_start", "date_end"], name="idx_book_overlap"),
+            # список броней админа: отель, без Отменен/Выселен, сортировка по -id_book.
+            # partial index (SQLite/PostgreSQL); на SQLite хватает и индекса FK, т.к. id_book = rowid
+            models.Index(
+                fields=["hotel", "-id_book"],
+                condition=~Q(book_status__in=["Отменен", "Выселен"]),
+                name="idx_book_admin_list",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Booking #{self.id_book} ({self.book_status})"
@@ -297,6 +333,31 @@ class RoomTypeAvailability(models.Model):
         return f"{self.hotel.name} {self.room_type.name} {self.day} free={self.free_rooms}"
 
 
+class RoomTypeDailyRevenue(models.Model):
+    """
+    Дневной срез продаж пары (отель, тип): сколько номеро-ночей продано и
+    выручка, размазанная по дням брони поровну. Источник квартального отчёта,
+    ведётся lab3_app.reports.refresh_revenue_rollup.
+    """
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name="daily_revenue")
+    room_type = models.ForeignKey(TypeOfRoom, on_delete=models.CASCADE, related_name="daily_revenue")
+    day = models.DateField()
+    nights_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "RoomTypeDailyRevenue"
+        constraints = [
+            models.UniqueConstraint(fields=["hotel", "room_type", "day"], name="uq_revenue_hotel_type_day"),
+        ]
+        indexes = [
+            models.Index(fields=["hotel", "day"], name="idx_revenue_hotel_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id}/{self.room_type_id} {self.day}: {self.nights_sold} nights, {self.revenue}"
+
+
 class BookingConvenience(models.Model):
     id = models.BigAutoField(primary_key=True)
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="booking_conveniences")
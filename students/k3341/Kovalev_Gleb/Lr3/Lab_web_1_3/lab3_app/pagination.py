@@ -0,0 +1,130 @@
+"""
+Keyset (cursor) пагинация для длинных админских списков (?pagination=cursor).
+
+В отличие от PageNumberPagination нет ни COUNT(*), ни OFFSET: следующая
+страница — это WHERE (поля сортировки) "после" последней строки + LIMIT,
+поэтому глубокие страницы стоят столько же, сколько первая.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+APPROX_COUNT_CAP = getattr(settings, "APPROX_COUNT_CAP", 1000)
+
+
+def cursor_requested(request) -> bool:
+    return request.query_params.get("pagination") == "cursor" or "cursor" in request.query_params
+
+
+def approximate_count(qs):
+    """
+    (count, exact). На PostgreSQL — оценка планировщика из EXPLAIN, иначе
+    COUNT по подзапросу с LIMIT APPROX_COUNT_CAP + 1.
+    """
+    qs = qs.order_by()
+    if connections[qs.db].vendor == "postgresql":
+        plan = json.loads(qs.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"]), False
+    n = qs[: APPROX_COUNT_CAP + 1].count()
+    return min(n, APPROX_COUNT_CAP), n <= APPROX_COUNT_CAP
+
+
+class KeysetPagination:
+    """
+    ordering — поля как в order_by(), последнее должно делать порядок
+    уникальным (pk). Курсор — base64(JSON) со значениями этих полей у
+    последней строки страницы.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.fields = [f.lstrip("-") for f in self.ordering]
+
+    def _page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def _decode(self, raw, model):
+        """Значения курсора, приведённые типами полей model (to_python)."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(raw.encode()).decode())
+        except (ValueError, UnicodeError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(values, list) or len(values) != len(self.ordering) or None in values:
+            raise NotFound("Invalid cursor")
+        try:
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound("Invalid cursor")
+
+    @staticmethod
+    def _encode(values):
+        return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+    def _after(self, values):
+        # (a, b, c) "после" (va, vb, vc): a > va OR (a = va AND b > vb) OR ...
+        cond, equal = Q(), {}
+        for field, name, value in zip(self.ordering, self.fields, values):
+            op = "lt" if field.startswith("-") else "gt"
+            cond |= Q(**equal, **{f"{name}__{op}": value})
+            equal[name] = value
+        return cond
+
+    def paginate_queryset(self, qs, request, columns=None):
+        """
+        qs — queryset моделей или values_list из compact_values(qs, columns);
+        во втором случае значения курсора берутся из кортежа по columns.
+        """
+        self.request = request
+        self.count = None
+        if request.query_params.get("count") == "approx":
+            self.count = approximate_count(qs)
+
+        raw = request.query_params.get(self.cursor_query_param)
+        qs = qs.order_by(*self.ordering)
+        if raw:
+            qs = qs.filter(self._after(self._decode(raw, qs.model)))
+
+        size = self._page_size(request)
+        rows = list(qs[: size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+
+        self.next_values = None
+        if self.has_next:
+            last = rows[-1]
+            if columns is not None:
+                paths = list(columns.values())
+                self.next_values = [last[paths.index(name)] for name in self.fields]
+            else:
+                self.next_values = [getattr(last, name) for name in self.fields]
+        return rows
+
+    def get_next_link(self):
+        if not self.next_values:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "pagination")
+        return replace_query_param(url, self.cursor_query_param, self._encode(self.next_values))
+
+    def get_paginated_response(self, data):
+        body = {"next": self.get_next_link()}
+        if self.count is not None:
+            body["count"], body["count_exact"] = self.count
+        body["results"] = data
+        return Response(body)
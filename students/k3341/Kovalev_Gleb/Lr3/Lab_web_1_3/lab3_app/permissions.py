@@ -1,13 +1,11 @@
 from rest_framework.permissions import BasePermission
 
+from .authentication import request_profile
+
 
 def _role(request, role: str) -> bool:
-    return bool(
-        request.user
-        and request.user.is_authenticated
-        and hasattr(request.user, "profile")
-        and request.user.profile.role == role
-    )
+    profile = request_profile(request)
+    return bool(profile and profile.role == role)
 
 
 class IsAdmin(BasePermission):
@@ -0,0 +1,128 @@
+"""
+Квартальный отчёт по выручке на дневных срезах RoomTypeDailyRevenue.
+
+Бронь (кроме отменённых) занимает номер на каждый день [date_start..date_end],
+как и в availability.py, а её price делится между этими днями поровну.
+Срезы обновляются на пути записи брони (refresh_revenue_rollup по затронутым
+дням) и целиком перестраиваются командой rebuild_revenue_rollup.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from .availability import CANCELLED, daterange
+from .models import Booking, Hotel, RoomInHotel, RoomTypeDailyRevenue, TypeOfRoom
+
+CENT = Decimal("0.01")
+
+
+def _money(value) -> str:
+    return str(Decimal(value or 0).quantize(CENT))
+
+
+def refresh_revenue_rollup(hotel: Hotel, room_type: TypeOfRoom, start: date, end: date, batch_size: int = 500):
+    """
+    Пересчитывает срезы пары за [start..end]: один сгруппированный запрос по
+    пересекающимся броням, sweep по дням и upsert всех дней диапазона
+    (нулевые тоже — чтобы затереть устаревшие значения).
+    """
+    if hotel is None or end < start:
+        return
+
+    nights_delta = defaultdict(int)
+    revenue_delta = defaultdict(Decimal)
+    groups = (
+        Booking.objects
+        .filter(hotel=hotel, room_type=room_type, date_start__lte=end, date_end__gte=start)
+        .exclude(book_status=CANCELLED)
+        .values("date_start", "date_end")
+        .annotate(cnt=Count("pk"), total=Sum("price"))
+        .order_by()
+    )
+    for g in groups:
+        per_day = Decimal(g["total"]) / ((g["date_end"] - g["date_start"]).days + 1)
+        first = max(g["date_start"], start)
+        after = min(g["date_end"], end) + timedelta(days=1)
+        nights_delta[first] += g["cnt"]
+        nights_delta[after] -= g["cnt"]
+        revenue_delta[first] += per_day
+        revenue_delta[after] -= per_day
+
+    rows, nights, revenue = [], 0, Decimal(0)
+    for day in daterange(start, end):
+        nights += nights_delta[day]
+        revenue += revenue_delta[day]
+        rows.append(RoomTypeDailyRevenue(
+            hotel=hotel, room_type=room_type, day=day,
+            nights_sold=nights, revenue=max(revenue, Decimal(0)).quantize(CENT),
+        ))
+
+    RoomTypeDailyRevenue.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["hotel", "room_type", "day"],
+        update_fields=["nights_sold", "revenue"],
+    )
+
+
+def quarterly_revenue(hotel: Hotel, start: date, end: date) -> dict:
+    """
+    Выручка, проданные ночи, загрузка и ADR по типам номеров за [start..end].
+    Два запроса: число номеров по типам и сумма срезов за период.
+    """
+    days = (end - start).days + 1
+
+    names, rooms = {}, {}
+    for r in (
+        RoomInHotel.objects.filter(hotel=hotel)
+        .values("room_type_id", "room_type__name")
+        .annotate(cnt=Count("id_number"))
+        .order_by()
+    ):
+        names[r["room_type_id"]] = r["room_type__name"]
+        rooms[r["room_type_id"]] = r["cnt"]
+
+    sold = {}
+    for r in (
+        RoomTypeDailyRevenue.objects.filter(hotel=hotel, day__range=(start, end))
+        .values("room_type_id", "room_type__name")
+        .annotate(nights=Sum("nights_sold"), revenue=Sum("revenue"))
+        .order_by()
+    ):
+        names.setdefault(r["room_type_id"], r["room_type__name"])
+        sold[r["room_type_id"]] = r
+
+    def line(nights, revenue, capacity):
+        return {
+            "revenue": _money(revenue),
+            "nights_sold": nights,
+            "occupancy_rate": round(nights / capacity, 4) if capacity else 0,
+            "adr": _money(Decimal(revenue) / nights) if nights else _money(0),
+        }
+
+    room_types = []
+    total_nights, total_revenue, total_capacity = 0, Decimal(0), 0
+    for type_id in sorted(names):
+        nights = sold.get(type_id, {}).get("nights") or 0
+        revenue = Decimal(sold.get(type_id, {}).get("revenue") or 0)
+        capacity = rooms.get(type_id, 0) * days
+        room_types.append({
+            "room_type_id": type_id,
+            "name": names[type_id],
+            "rooms": rooms.get(type_id, 0),
+            **line(nights, revenue, capacity),
+        })
+        total_nights += nights
+        total_revenue += revenue
+        total_capacity += capacity
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": days,
+        "room_types": room_types,
+        "total": line(total_nights, total_revenue, total_capacity),
+    }
@@ -0,0 +1,63 @@
+"""
+Поиск клиентов по таблице ClientSearchToken.
+
+Поля клиента режутся на слова, приводятся к нижнему регистру (ё -> е) и
+хранятся в двух формах: как есть и транслитом, так что "ivan" находит
+"Иван". Запрос ищет каждое своё слово как префикс токена (не подстроку:
+"ван" не находит "Иван"): это range-скан по индексу (token, client), а не
+полный проход по Client.
+"""
+import re
+
+from django.db.models import Subquery
+
+from .models import ClientSearchToken
+
+SEARCH_FIELDS = ("name", "surname", "fathers_name", "email")
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z", "и": "i",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s",
+    "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+})
+_WORD = re.compile(r"\w+")
+_MAX_LEN = ClientSearchToken._meta.get_field("token").max_length
+
+
+def _words(text: str):
+    return _WORD.findall((text or "").lower().replace("ё", "е"))
+
+
+def tokenize(*texts) -> set:
+    tokens = set()
+    for text in texts:
+        for word in _words(text):
+            tokens.add(word[:_MAX_LEN])
+            tokens.add(word.translate(_TRANSLIT)[:_MAX_LEN])
+    tokens.discard("")
+    return tokens
+
+
+def client_tokens(client) -> list:
+    return [
+        ClientSearchToken(client_id=client.pk, token=t)
+        for t in tokenize(*(getattr(client, f) for f in SEARCH_FIELDS))
+    ]
+
+
+def reindex_client(client):
+    ClientSearchToken.objects.filter(client_id=client.pk).delete()
+    ClientSearchToken.objects.bulk_create(client_tokens(client), ignore_conflicts=True)
+
+
+def filter_by_client_search(qs, q: str, client_field: str = "client_id"):
+    """
+    Каждое слово запроса должно быть префиксом какого-нибудь токена клиента.
+    Всё уходит подзапросами в тот же SQL, что и qs.
+    """
+    for word in _words(q):
+        word = word[:_MAX_LEN]
+        matched = ClientSearchToken.objects.filter(token__startswith=word).values("client_id")
+        qs = qs.filter(**{f"{client_field}__in": Subquery(matched)})
+    return qs
@@ -1,11 +1,18 @@
+from django.db import models
 from rest_framework import serializers
+from .images import ImageUrlField, absolute_image_url
 from .models import (
     Hotel, RoomInHotel, TypeOfRoom, Convenience,
     Client, Staff, Booking, CheckIn, CleaningTime, Profile
 )
 
 
-class HotelSerializer(serializers.ModelSerializer):
+class ImageModelSerializer(serializers.ModelSerializer):
+    # поле image тоже идёт через absolute_image_url, как и image_url
+    serializer_field_mapping = {**serializers.ModelSerializer.serializer_field_mapping, models.ImageField: ImageUrlField}
+
+
+class HotelSerializer(ImageModelSerializer):
     image_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -13,14 +20,10 @@ class HotelSerializer(serializers.ModelSerializer):
         fields = ["id_hotel", "city", "name", "num_of_rooms", "address", "image", "image_url"]
 
     def get_image_url(self, obj):
-        if not obj.image:
-            return None
-        request = self.context.get("request")
-        url = obj.image.url
-        return request.build_absolute_uri(url) if request else url
+        return absolute_image_url(self.context.get("request"), obj.image)
 
 
-class RoomTypeInHotelSerializer(serializers.ModelSerializer):
+class RoomTypeInHotelSerializer(ImageModelSerializer):
     total_rooms = serializers.IntegerField()
     free_rooms = serializers.IntegerField()
     image_url = serializers.SerializerMethodField()
@@ -30,14 +33,10 @@ class RoomTypeInHotelSerializer(serializers.ModelSerializer):
         fields = ["id_type", "name", "num_of_places", "base_price", "total_rooms", "free_rooms", "image", "image_url"]
 
     def get_image_url(self, obj):
-        if not obj.image:
-            return None
-        request = self.context.get("request")
-        url = obj.image.url
-        return request.build_absolute_uri(url) if request else url
+        return absolute_image_url(self.context.get("request"), obj.image)
 
 
-class TypeOfRoomSerializer(serializers.ModelSerializer):
+class TypeOfRoomSerializer(ImageModelSerializer):
     image_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -45,13 +44,9 @@ class TypeOfRoomSerializer(serializers.ModelSerializer):
         fields = ["id_type", "name", "num_of_places", "base_price", "num_of_rooms", "num_of_free_rooms", "image", "image_url"]
 
     def get_image_url(self, obj):
-        if not obj.image:
-            return None
-        request = self.context.get("request")
-        url = obj.image.url
-        return request.build_absolute_uri(url) if request else url
+        return absolute_image_url(self.context.get("request"), obj.image)
 
-class RoomTypeDetailSerializer(serializers.ModelSerializer):
+class RoomTypeDetailSerializer(ImageModelSerializer):
     image_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -59,11 +54,7 @@ class RoomTypeDetailSerializer(serializers.ModelSerializer):
         fields = ["id_type", "name", "num_of_places", "base_price", "image", "image_url"]
 
     def get_image_url(self, obj):
-        if not obj.image:
-            return None
-        request = self.context.get("request")
-        url = obj.image.url
-        return request.build_absolute_uri(url) if request else url
+        return absolute_image_url(self.context.get("request"), obj.image)
 
 
 class RoomShortSerializer(serializers.ModelSerializer):
@@ -153,6 +144,24 @@ class CleaningCreateSerializer(serializers.ModelSerializer):
         fields = ["room", "cleaning_time", "date", "cleaning_status"]
 
 
+class CleaningBatchItemSerializer(serializers.Serializer):
+    # id номера без PrimaryKeyRelatedField: принадлежность отелю проверяется одним запросом во view
+    room = serializers.IntegerField()
+    cleaning_time = serializers.TimeField()
+    cleaning_status = serializers.ChoiceField(choices=CleaningTime.STATUSES)
+
+
+class CleaningBatchSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    items = CleaningBatchItemSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_items(self, items):
+        rooms = [i["room"] for i in items]
+        if len(set(rooms)) != len(rooms):
+            raise serializers.ValidationError("each room may appear only once per batch")
+        return items
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     hotel = HotelSerializer(read_only=True)
     client = ClientSerializer(read_only=True)
@@ -185,6 +194,9 @@ class BookingAdminListSerializer(serializers.ModelSerializer):
         ]
 
     def get_room_number(self, obj):
+        # списки и admin-действия передают номер готовым (см. views._with_room_number)
+        if hasattr(obj, "latest_room_number"):
+            return obj.latest_room_number
         ch = obj.checkins.select_related("room").order_by("-id_check_in").first()
         return ch.room.room_number if ch else None
 
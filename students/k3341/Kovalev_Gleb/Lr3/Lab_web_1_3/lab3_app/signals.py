@@ -1,12 +1,38 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
 
-from .models import Profile
+from .authentication import forget_tokens
+from .models import Client, Profile
+from .search import reindex_client
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.get_or_create(user=instance)
\ No newline at end of file
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Client)
+def update_client_search(sender, instance, raw=False, **kwargs):
+    # bulk_create/update мимо сигналов -> manage.py rebuild_client_search
+    if not raw:
+        reindex_client(instance)
+
+
+# ---------- кэш токен-аутентификации (AUTH_TOKEN_CACHE_TTL) ----------
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def forget_user_tokens(sender, instance, **kwargs):
+    if getattr(settings, "AUTH_TOKEN_CACHE_TTL", 0) > 0:
+        user_id = instance.pk if sender is User else instance.user_id
+        forget_tokens(*Token.objects.filter(user_id=user_id).values_list("key", flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_tokens(instance.key)
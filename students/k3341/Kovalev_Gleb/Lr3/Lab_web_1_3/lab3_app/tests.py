@@ -1,3 +1,753 @@
-from django.test import TestCase
+from io import StringIO
+from datetime import date, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .availability import apply_booking_change, cached_free_rooms, ensure_availability, recompute_availability
+from .images import _resolve
+from .search import filter_by_client_search
+from .models import (
+    Booking, CheckIn, CleaningTime, Client, ContractNumber, Hotel, Profile, RoomInHotel, RoomTypeAvailability,
+    RoomTypeDailyRevenue, Staff, TypeOfRoom,
+)
+
+User = get_user_model()
+
+FAR = date(2100, 1, 1)
+
+
+def _hotel_fixture(rooms: int):
+    """Отель с одним типом номеров на `rooms` номеров, администратор и клиент."""
+    hotel = Hotel.objects.create(city="Тест", name="Test", num_of_rooms=rooms, address="Street 1")
+    room_type = TypeOfRoom.objects.create(
+        name="Standard", num_of_rooms=rooms, num_of_places=2, base_price=1000, num_of_free_rooms=rooms,
+    )
+    RoomInHotel.objects.bulk_create([
+        RoomInHotel(
+            hotel=hotel, room_type=room_type, room_number=100 + i,
+            places_number=2, status="Свободен", cleaned=True,
+        )
+        for i in range(rooms)
+    ])
+    contract = ContractNumber.objects.create(
+        contract_number=1, beginning_of_contract=date(2020, 1, 1), end_of_contract=FAR,
+        number_of_job_days=20, type_of_contract="Постоянный",
+    )
+    staff = Staff.objects.create(contract=contract, full_name="Admin", job_title="Администратор")
+    client = Client.objects.create(
+        name="Ivan", surname="Petrov", home_adress="Street 2", mobile_number="+70000000000", email="ivan@test.ru",
+    )
+    return {"hotel": hotel, "room_type": room_type, "staff": staff, "client": client, "contract": contract}
+
+
+def _api_as(role: str, **profile):
+    """APIClient от нового пользователя с профилем role и полями profile (hotel, staff, client)."""
+    user = User.objects.create_user(username=f"{role}-{User.objects.count() + 1}", password="pass")
+    Profile.objects.filter(user=user).update(role=role, **profile)
+    # сбрасываем закэшированный user.profile после update()
+    user.refresh_from_db()
+    api = APIClient()
+    api.force_authenticate(user)
+    return api
+
+
+def _book(f, start: date, end: date, status="Забронирован", room_type=None):
+    room_type = room_type or f["room_type"]
+    return Booking.objects.create(
+        book_status=status, date_start=start, date_end=end,
+        client=f["client"], staff=f["staff"], room_type=room_type, hotel=f["hotel"],
+        price=Decimal(room_type.base_price * ((end - start).days + 1)), payed=Decimal("0.00"),
+        type_of_payment="Карта",
+    )
+
+
+def _free_rooms(f, start: date, end: date):
+    return dict(
+        RoomTypeAvailability.objects
+        .filter(hotel=f["hotel"], room_type=f["room_type"], day__range=(start, end))
+        .order_by("day")
+        .values_list("day", "free_rooms")
+    )
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Каждый маршрут из lab3_app/urls.py вызывается на базе из 10 и из 100 строк
+    (номера, клиенты, брони), число SQL-запросов не должно расти вместе с данными.
+    """
+
+    SMALL, LARGE = 10, 100
+
+    def _seed(self, rows: int):
+        call_command(
+            "seed_fake_data",
+            hotels=1, rooms_per_hotel=rows, clients=rows, bookings=rows, seed=rows,
+            stdout=StringIO(),
+        )
+        cache.clear()
+
+        hotel = Hotel.objects.get()
+        Booking.objects.update(hotel=hotel)
+        room_type = TypeOfRoom.objects.order_by("id_type").first()
+
+        admin_staff = Staff.objects.filter(job_title="Администратор").first()
+        cleaner_staff = Staff.objects.filter(job_title="Уборщик").first()
+
+        admin = User.objects.get(username="admin1")
+        Profile.objects.filter(user=admin).update(staff=admin_staff)
+        cleaner = User.objects.get(username="cleaner1")
+        Profile.objects.filter(user=cleaner).update(hotel=hotel, staff=cleaner_staff)
+
+        # у клиента должны быть брони, чтобы my-bookings рос вместе с данными
+        client_user = User.objects.get(username="client1")
+        client = Booking.objects.order_by("id_book").first().client
+        Booking.objects.filter(id_book__in=list(Booking.objects.values_list("id_book", flat=True)[: rows // 2])).update(
+            client=client
+        )
+        Profile.objects.filter(user=client_user).update(client=client)
+
+        # отдельные номера и брони под мутирующие эндпоинты — чтобы обе базы шли по одному пути
+        free_rooms = [
+            RoomInHotel.objects.create(
+                hotel=hotel, room_type=room_type, room_number=900 + i,
+                places_number=room_type.num_of_places, status="Свободен", cleaned=True,
+            )
+            for i in range(3)
+        ]
+
+        def booking(status, client_=None, days=(0, 2)):
+            price = Decimal(room_type.base_price * (days[1] - days[0] + 1))
+            return Booking.objects.create(
+                book_status=status,
+                date_start=FAR + timedelta(days=days[0]),
+                date_end=FAR + timedelta(days=days[1]),
+                client=client_ or client, staff=admin_staff, room_type=room_type, hotel=hotel,
+                price=price, payed=Decimal("0.00"), type_of_payment="Карта",
+            )
+
+        # хотя бы один проживающий сегодня и на малой базе
+        resident = booking("Заселен", days=(0, 1))
+        resident.date_start, resident.date_end = date.today(), date.today() + timedelta(days=1)
+        resident.save(update_fields=["date_start", "date_end"])
+        CheckIn.objects.create(
+            date_check_in=resident.date_start, date_check_out=resident.date_end, client=client,
+            room=free_rooms[2], staff=admin_staff, booking=resident,
+        )
+
+        cleaning = CleaningTime.objects.create(
+            room=free_rooms[1], staff=cleaner_staff, cleaning_time=time(10, 0),
+            date=date.today() + timedelta(days=30), cleaning_status="Не убран",
+        )
+
+        return {
+            "hotel": hotel,
+            "room_type": room_type,
+            "rooms": free_rooms,
+            "admin": admin,
+            "admin_staff": admin_staff,
+            "cleaner": cleaner,
+            "cleaner_staff": cleaner_staff,
+            "client_user": client_user,
+            "client": client,
+            "to_checkin": booking("Забронирован", days=(10, 12)),
+            "to_patch": booking("Забронирован", days=(20, 22)),
+            "to_cancel": booking("Ожидает оплату", days=(30, 32)),
+            "to_pay": booking("Ожидает оплату", days=(40, 42)),
+            "old_checkin": booking("Забронирован", days=(50, 52)),
+            "cleaning": cleaning,
+            "contract": ContractNumber.objects.first(),
+        }
+
+    def _run_endpoints(self, f):
+        """Возвращает {endpoint: (queries, status_code)}."""
+        api = APIClient()
+        results = {}
+        h, t = f["hotel"].id_hotel, f["room_type"].id_type
+
+        def call(name, user, method, url, data=None, fmt="json", **extra):
+            api.force_authenticate(user)
+            with CaptureQueriesContext(connection) as ctx:
+                resp = getattr(api, method)(url, data, format=fmt, **extra)
+                if resp.streaming:
+                    # запросы потоковых выгрузок идут при чтении тела
+                    b"".join(resp.streaming_content)
+            results[name] = (len(ctx), resp.status_code)
+            return resp
+
+        # ---- public / hotels ----
+        call("GET hotels", None, "get", "/api/hotels/")
+        call("GET hotel", None, "get", f"/api/hotels/{h}/")
+        call("GET hotel room-types", None, "get", f"/api/hotels/{h}/room-types/")
+        call("GET hotel rooms", None, "get", f"/api/hotels/{h}/rooms/")
+        call("GET hotel room-type", None, "get", f"/api/hotels/{h}/room-types/{t}/")
+        call(
+            "GET availability", None, "get",
+            f"/api/hotels/{h}/room-types/{t}/availability/?start={date.today()}&end={date.today() + timedelta(days=30)}",
+        )
+        call("GET calendar", None, "get", f"/api/hotels/{h}/calendar/")
+        call(
+            "GET search", None, "get",
+            f"/api/hotels/search/?city={f['hotel'].city}&start={date.today()}&end={date.today() + timedelta(days=7)}",
+        )
+        call("PATCH hotel", f["admin"], "patch", f"/api/hotels/{h}/", {"address": "Street 1"})
+        call("GET room-types", None, "get", "/api/room-types/")
+        call("GET room-type", None, "get", f"/api/room-types/{t}/")
+        call("PATCH room-type", f["admin"], "patch", f"/api/room-types/{t}/", {"base_price": 4000}, fmt="multipart")
+        call("GET rooms", f["admin"], "get", "/api/rooms/")
+        call("GET room", f["admin"], "get", f"/api/rooms/{f['rooms'][0].id_number}/")
+
+        # ---- client ----
+        cu = f["client_user"]
+        call("GET client me", cu, "get", "/api/client/me/")
+        call("GET client my-bookings", cu, "get", "/api/client/my-bookings/")
+        call("GET client my-bookings compact", cu, "get", "/api/client/my-bookings/?compact=1")
+        call("POST hotel book", cu, "post", f"/api/hotels/{h}/room-types/{t}/book/", {
+            "date_start": str(FAR + timedelta(days=60)), "date_end": str(FAR + timedelta(days=62)),
+        })
+        call("POST client book", cu, "post", "/api/client/book/", {
+            "book_status": "Ожидает оплату", "date_start": str(FAR + timedelta(days=70)),
+            "date_end": str(FAR + timedelta(days=71)), "room_type": t, "price": "100.00",
+            "payed": "0.00", "type_of_payment": "Карта",
+        })
+        call("POST client pay", cu, "post", f"/api/client/bookings/{f['to_pay'].id_book}/pay/", {"amount": "1.00"})
+        call("POST client cancel", cu, "post", f"/api/client/bookings/{f['to_cancel'].id_book}/cancel/")
+
+        # ---- admin ----
+        ad = f["admin"]
+        call("GET admin hotel", ad, "get", "/api/admin/hotel/")
+        # настоящая токен-аутентификация: профиль с отелем приходят одним JOIN
+        token = Token.objects.create(user=ad)
+        call("GET admin hotel by token", None, "get", "/api/admin/hotel/", HTTP_AUTHORIZATION=f"Token {token.key}")
+        call("GET admin dashboard", ad, "get", "/api/admin/dashboard/")
+        call("GET admin rooms", ad, "get", "/api/admin/rooms/?page_size=100")
+        call("GET admin rooms cursor", ad, "get", "/api/admin/rooms/?pagination=cursor&count=approx")
+        call("GET admin residents", ad, "get", "/api/admin/residents/")
+        call("GET admin residents compact", ad, "get", "/api/admin/residents/?compact=1")
+        old = f["old_checkin"]
+        resp = call("POST admin checkin", ad, "post", "/api/admin/checkin/", {
+            "staff_id": f["admin_staff"].id_staff, "date_check_in": str(old.date_start),
+            "date_check_out": str(old.date_end), "client": old.client_id,
+            "room": f["rooms"][2].id_number, "booking": old.id_book,
+        })
+        checkin_id = resp.data.get("id_check_in") if resp.status_code == 201 else 0
+        call("POST admin checkout", ad, "post", f"/api/admin/checkins/{checkin_id}/checkout/", {
+            "date_check_out": str(old.date_end),
+        })
+        for kind in ("bookings", "checkins", "cleanings"):
+            call(f"GET admin export {kind} csv", ad, "get", f"/api/admin/export/{kind}/")
+            call(f"GET admin export {kind} ndjson", ad, "get", f"/api/admin/export/{kind}/?fmt=ndjson&start={date.today()}")
+        call("GET admin quarterly report", ad, "get", f"/api/admin/report/quarterly/?year={FAR.year}&quarter=1")
+        call("POST admin staff", ad, "post", "/api/admin/staff/", {
+            "contract": f["contract"].contract_number, "full_name": "Test Staff", "job_title": "Техник",
+        })
+
+        call("GET admin bookings", ad, "get", "/api/admin/bookings/?page_size=100")
+        call("GET admin bookings compact", ad, "get", "/api/admin/bookings/?page_size=100&compact=1")
+        call("GET admin bookings search", ad, "get", f"/api/admin/bookings/?q={f['client'].surname}")
+        resp = call("GET admin bookings cursor", ad, "get", "/api/admin/bookings/?pagination=cursor&compact=1")
+        call("GET admin bookings next cursor", ad, "get", resp.data["next"] or "/api/admin/bookings/?cursor=")
+        call("PATCH admin booking", ad, "patch", f"/api/admin/bookings/{f['to_patch'].id_book}/", {
+            "date_end": str(f["to_patch"].date_end + timedelta(days=1)),
+        })
+        b = f["to_checkin"].id_book
+        call("POST admin booking checkin", ad, "post", f"/api/admin/bookings/{b}/checkin/", {
+            "room_id": f["rooms"][0].id_number,
+        })
+        call("POST admin booking change-room", ad, "post", f"/api/admin/bookings/{b}/change-room/", {
+            "room_id": f["rooms"][1].id_number,
+        })
+        call("POST admin booking checkout", ad, "post", f"/api/admin/bookings/{b}/checkout/", {
+            "date_check_out": str(f["to_checkin"].date_end),
+        })
+
+        s = f["cleaner_staff"].id_staff
+        call("GET admin cleaners", ad, "get", "/api/admin/cleaners/?page_size=100")
+        call(
+            "GET admin cleaner stats", ad, "get",
+            f"/api/admin/cleaners/{s}/stats/?start={date.today() - timedelta(days=30)}&end={date.today()}",
+        )
+        call("GET admin cleanings", ad, "get", "/api/admin/cleanings/?page_size=100")
+        call("GET admin cleanings compact", ad, "get", "/api/admin/cleanings/?page_size=100&compact=1")
+        call("GET admin cleanings cursor", ad, "get", "/api/admin/cleanings/?pagination=cursor")
+        call("PATCH admin cleaning", ad, "patch", f"/api/admin/cleanings/{f['cleaning'].id_cleaning}/", {
+            "cleaning_status": "Убран",
+        })
+
+        # ---- cleaner ----
+        cl = f["cleaner"]
+        call("GET cleaner my-hotel", cl, "get", "/api/cleaner/my-hotel/")
+        call("GET cleaner rooms", cl, "get", "/api/cleaner/rooms/")
+        call("GET cleaner board", cl, "get", f"/api/cleaner/board/?date={date.today() + timedelta(days=30)}")
+        call("GET cleaner cleanings", cl, "get", "/api/cleaner/cleanings/")
+        call("GET cleaner cleanings compact", cl, "get", "/api/cleaner/cleanings/?compact=1")
+        resp = call("POST cleaner cleaning", cl, "post", "/api/cleaner/cleanings/", {
+            "room": f["rooms"][0].id_number, "cleaning_time": "11:00",
+            "date": str(date.today() + timedelta(days=31)), "cleaning_status": "Убран",
+        })
+        cleaning_id = resp.data.get("id_cleaning") if resp.status_code in (200, 201) else 0
+        call("DELETE cleaner cleaning", cl, "delete", f"/api/cleaner/cleanings/{cleaning_id}/")
+        call("POST cleaner cleanings batch", cl, "post", "/api/cleaner/cleanings/batch/", {
+            "date": str(date.today() + timedelta(days=30)),
+            "items": [
+                {"room": room.id_number, "cleaning_time": "12:00", "cleaning_status": st}
+                for room, st in zip(f["rooms"], ("Убран", "Не убран", "Убран"))
+            ],
+        })
+
+        # последним: деактивирует пользователя-уборщика
+        call("POST admin fire cleaner", ad, "post", f"/api/admin/cleaners/{s}/fire/")
+
+        return results
+
+    def _measure(self, rows: int):
+        with transaction.atomic():
+            fixtures = self._seed(rows)
+            results = self._run_endpoints(fixtures)
+            transaction.set_rollback(True)
+        return results
+
+    def test_query_count_does_not_grow_with_rows(self):
+        small = self._measure(self.SMALL)
+        large = self._measure(self.LARGE)
+
+        problems = []
+        for name, (q_small, st_small) in small.items():
+            q_large, st_large = large[name]
+            if st_small >= 400 or st_large >= 400:
+                problems.append(f"{name}: unexpected status {st_small}/{st_large}")
+            elif q_large > q_small:
+                problems.append(f"{name}: {q_small} queries @ {self.SMALL} rows -> {q_large} @ {self.LARGE} rows")
+
+        if problems:
+            self.fail("Query budget exceeded:\n  " + "\n  ".join(problems))
+
+
+class ApplyBookingChangeTests(TestCase):
+    """apply_booking_change должен давать те же free_rooms, что и полный пересчёт."""
+
+    START, END = FAR, FAR + timedelta(days=10)
+
+    def setUp(self):
+        self.f = _hotel_fixture(rooms=2)
+
+    def _change(self, booking, **fields):
+        old = (booking.date_start, booking.date_end, booking.book_status)
+        for name, value in fields.items():
+            setattr(booking, name, value)
+        booking.save()
+        apply_booking_change(
+            self.f["hotel"], self.f["room_type"], old, (booking.date_start, booking.date_end, booking.book_status),
+        )
+
+    def _assert_matches_recompute(self):
+        incremental = _free_rooms(self.f, self.START, self.END)
+        recompute_availability(self.f["hotel"], self.f["room_type"], self.START, self.END)
+        self.assertEqual(incremental, _free_rooms(self.f, self.START, self.END))
+
+    def test_shift_cancel_uncancel(self):
+        booking = _book(self.f, FAR, FAR + timedelta(days=4))
+        _book(self.f, FAR + timedelta(days=2), FAR + timedelta(days=3))
+        ensure_availability(self.f["hotel"], self.f["room_type"], self.START, self.END)
+
+        self._change(booking, date_start=FAR + timedelta(days=3), date_end=FAR + timedelta(days=7))
+        self._assert_matches_recompute()
+
+        self._change(booking, book_status="Отменен")
+        self._assert_matches_recompute()
+
+        self._change(booking, book_status="Забронирован")
+        self._assert_matches_recompute()
+        self.assertEqual(_free_rooms(self.f, FAR + timedelta(days=3), FAR + timedelta(days=3)), {
+            FAR + timedelta(days=3): 0,
+        })
+
+    def test_sold_out_days_stay_at_zero(self):
+        _book(self.f, FAR, FAR + timedelta(days=2))
+        _book(self.f, FAR, FAR + timedelta(days=2))
+        extra = _book(self.f, FAR + timedelta(days=1), FAR + timedelta(days=4), status="Отменен")
+        ensure_availability(self.f["hotel"], self.f["room_type"], self.START, self.END)
+
+        # сверхбронь на распроданные дни: free_rooms__gt=0 не даёт уйти ниже нуля
+        self._change(extra, book_status="Забронирован")
+
+        free = _free_rooms(self.f, self.START, self.END)
+        self.assertEqual(free[FAR + timedelta(days=1)], 0)
+        self.assertEqual(free[FAR + timedelta(days=3)], 1)
+        self.assertGreaterEqual(min(free.values()), 0)
+        self._assert_matches_recompute()
+
+        # снятие сверхброни: дни 1-2 всё ещё заняты двумя бронями на два номера
+        self._change(extra, book_status="Отменен")
+
+        free = _free_rooms(self.f, FAR, FAR + timedelta(days=5))
+        self.assertEqual(list(free.values()), [0, 0, 0, 2, 2, 2])
+        self._assert_matches_recompute()
+
+
+class VerifyAvailabilityTests(TestCase):
+    """verify_availability находит испорченные free_rooms / статусы / счётчики, --fix их чинит."""
+
+    START, END = FAR, FAR + timedelta(days=5)
+
+    def setUp(self):
+        self.f = _hotel_fixture(rooms=3)
+        self.rooms = list(RoomInHotel.objects.order_by("room_number"))
+
+        _book(self.f, FAR, FAR + timedelta(days=2))
+        resident = _book(self.f, FAR + timedelta(days=1), FAR + timedelta(days=3), status="Заселен")
+        CheckIn.objects.create(
+            date_check_in=resident.date_start, date_check_out=resident.date_end, client=self.f["client"],
+            room=self.rooms[0], staff=self.f["staff"], booking=resident,
+        )
+        RoomInHotel.objects.filter(pk=self.rooms[0].pk).update(status="Занят")
+        TypeOfRoom.objects.filter(pk=self.f["room_type"].pk).update(num_of_free_rooms=2)
+        ensure_availability(self.f["hotel"], self.f["room_type"], self.START, self.END)
+
+    def _verify(self, **opts):
+        out = StringIO()
+        call_command("verify_availability", stdout=out, **opts)
+        return out.getvalue()
+
+    def _state(self):
+        return (
+            _free_rooms(self.f, self.START, self.END),
+            list(RoomInHotel.objects.order_by("room_number").values_list("status", flat=True)),
+            TypeOfRoom.objects.get(pk=self.f["room_type"].pk).num_of_free_rooms,
+        )
+
+    def test_reports_and_fixes_all_three_tables(self):
+        self.assertIn("availability days=0, room statuses=0, room types=0", self._verify())
+        good = self._state()
+        self.assertEqual(list(good[0].values()), [2, 1, 1, 2, 3, 3])
+
+        # верные значения: 2, 1, 1, 2, 3, 3
+        for offset, free in ((0, 0), (1, 3), (4, 2)):
+            RoomTypeAvailability.objects.filter(day=FAR + timedelta(days=offset)).update(free_rooms=free)
+        RoomInHotel.objects.filter(pk=self.rooms[0].pk).update(status="Свободен")
+        RoomInHotel.objects.filter(pk=self.rooms[1].pk).update(status="Занят")
+        TypeOfRoom.objects.filter(pk=self.f["room_type"].pk).update(num_of_free_rooms=0)
+        broken = self._state()
+
+        # без --fix только отчёт
+        self.assertIn("Mismatches found: availability days=3, room statuses=2, room types=1", self._verify())
+        self.assertEqual(self._state(), broken)
+
+        self.assertIn("Mismatches fixed: availability days=3, room statuses=2, room types=1", self._verify(fix=True))
+        self.assertEqual(self._state(), good)
+
+        recompute_availability(self.f["hotel"], self.f["room_type"], self.START, self.END)
+        self.assertEqual(self._state(), good)
+        self.assertIn("availability days=0, room statuses=0, room types=0", self._verify())
+
+
+class ReserveRoomTypeTests(TestCase):
+    """Бронирование типа номера через один условный UPDATE не продаёт лишних ночей."""
+
+    def setUp(self):
+        self.f = _hotel_fixture(rooms=3)
+        self.api = _api_as("client", client=self.f["client"])
+
+    def test_overbooking_is_rejected(self):
+        h, t = self.f["hotel"].id_hotel, self.f["room_type"].id_type
+        start, end = FAR, FAR + timedelta(days=2)
+
+        codes = [
+            self.api.post(f"/api/hotels/{h}/room-types/{t}/book/", {
+                "date_start": str(start), "date_end": str(end),
+            }, format="json").status_code
+            for _ in range(5)
+        ]
+
+        self.assertEqual(codes, [201, 201, 201, 400, 400])
+        self.assertEqual(Booking.objects.count(), 3)
+        free = _free_rooms(self.f, start, end)
+        self.assertEqual(set(free.values()), {0})
+
+        # отказанные брони откатились целиком: пересчёт по броням даёт то же самое
+        recompute_availability(self.f["hotel"], self.f["room_type"], start, end)
+        self.assertEqual(free, _free_rooms(self.f, start, end))
+
+
+class CalendarParamsTests(TestCase):
+    def test_non_numeric_type_id_is_rejected(self):
+        f = _hotel_fixture(rooms=1)
+        resp = APIClient().get(f"/api/hotels/{f['hotel'].id_hotel}/calendar/?type_id=abc")
+        self.assertEqual(resp.status_code, 400)
+
+
+class CachedFreeRoomsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.f = _hotel_fixture(rooms=2)
+
+    def test_miss_does_not_materialize_past_days(self):
+        today = date.today()
+        self.assertEqual(cached_free_rooms(self.f["hotel"], self.f["room_type"], today, today), [2])
+        self.assertFalse(RoomTypeAvailability.objects.filter(day__lt=today).exists())
+
+        # явно запрошенные прошедшие дни всё же считаются, в том числе поверх закэшированного месяца
+        past = today - timedelta(days=3)
+        self.assertEqual(cached_free_rooms(self.f["hotel"], self.f["room_type"], past, today), [2] * 4)
+        self.assertFalse(RoomTypeAvailability.objects.filter(day__lt=past).exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.f = _hotel_fixture(rooms=3)
+        self.api = _api_as("admin", hotel=self.f["hotel"], staff=self.f["staff"])
+
+    def _walk(self, url, key):
+        seen = []
+        while url:
+            resp = self.api.get(url)
+            self.assertEqual(resp.status_code, 200)
+            seen += [row[key] for row in resp.data["results"]]
+            url = resp.data["next"]
+        return seen
+
+    def test_walks_every_booking_once(self):
+        ids = [_book(self.f, FAR + timedelta(days=i), FAR + timedelta(days=i)).id_book for i in range(25)]
+        seen = self._walk("/api/admin/bookings/?pagination=cursor&page_size=4", "id_book")
+        self.assertEqual(seen, sorted(ids, reverse=True))
+
+    def test_walks_every_cleaning_once_with_ties(self):
+        # одинаковые (date, cleaning_time) у разных номеров: порядок решает id_cleaning
+        rooms = RoomInHotel.objects.filter(hotel=self.f["hotel"])
+        ids = [
+            CleaningTime.objects.create(
+                room=room, staff=self.f["staff"], cleaning_time=time(10, 0),
+                date=FAR + timedelta(days=i), cleaning_status="Убран",
+            ).id_cleaning
+            for i in range(4) for room in rooms
+        ]
+        seen = self._walk("/api/admin/cleanings/?pagination=cursor&page_size=5", "id_cleaning")
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), set(ids))
+
+    def test_malformed_cursor_is_not_found(self):
+        for cursor in ("WyJhYmMiXQ==", "W251bGxd", "W1sxXV0=", "not-base64"):
+            resp = self.api.get(f"/api/admin/bookings/?cursor={cursor}")
+            self.assertEqual(resp.status_code, 404, cursor)
+
+
+class QuarterlyReportTests(TestCase):
+    """Отчёт по срезам RoomTypeDailyRevenue после брони, отмены и переселения в другой тип."""
+
+    def setUp(self):
+        self.f = _hotel_fixture(rooms=2)
+        self.suite = TypeOfRoom.objects.create(
+            name="Suite", num_of_rooms=1, num_of_places=3, base_price=3000, num_of_free_rooms=1,
+        )
+        self.suite_room = RoomInHotel.objects.create(
+            hotel=self.f["hotel"], room_type=self.suite, room_number=200,
+            places_number=3, status="Свободен", cleaned=True,
+        )
+
+        self.guest = _api_as("client", client=self.f["client"])
+        self.admin = _api_as("admin", hotel=self.f["hotel"], staff=self.f["staff"])
+
+    def _book(self, start: date, end: date) -> int:
+        h, t = self.f["hotel"].id_hotel, self.f["room_type"].id_type
+        resp = self.guest.post(f"/api/hotels/{h}/room-types/{t}/book/", {
+            "date_start": str(start), "date_end": str(end),
+        }, format="json")
+        self.assertEqual(resp.status_code, 201)
+        return resp.data["id_book"]
+
+    def test_report_totals(self):
+        # Standard: 3 ночи по 1000
+        self._book(FAR, FAR + timedelta(days=2))
+
+        # отменённая бронь в отчёт не попадает
+        cancelled = self._book(FAR + timedelta(days=10), FAR + timedelta(days=11))
+        resp = self.guest.post(f"/api/client/bookings/{cancelled}/cancel/")
+        self.assertEqual(resp.status_code, 200)
+
+        # 2 ночи переезжают из Standard в Suite: цена становится 2 * 3000
+        moved = self._book(FAR + timedelta(days=20), FAR + timedelta(days=21))
+        standard_room = RoomInHotel.objects.filter(room_type=self.f["room_type"]).first()
+        resp = self.admin.post(f"/api/admin/bookings/{moved}/checkin/", {"room_id": standard_room.id_number})
+        self.assertEqual(resp.status_code, 201)
+        resp = self.admin.post(f"/api/admin/bookings/{moved}/change-room/", {"room_id": self.suite_room.id_number})
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.admin.get(f"/api/admin/report/quarterly/?year={FAR.year}&quarter=1")
+        self.assertEqual(resp.status_code, 200)
+        report = resp.data
+        self.assertEqual(report["days"], 90)
+
+        by_name = {t["name"]: t for t in report["room_types"]}
+        self.assertEqual(by_name["Standard"], {
+            "room_type_id": self.f["room_type"].id_type, "name": "Standard", "rooms": 2,
+            "revenue": "3000.00", "nights_sold": 3, "occupancy_rate": round(3 / 180, 4), "adr": "1000.00",
+        })
+        self.assertEqual(by_name["Suite"], {
+            "room_type_id": self.suite.id_type, "name": "Suite", "rooms": 1,
+            "revenue": "6000.00", "nights_sold": 2, "occupancy_rate": round(2 / 90, 4), "adr": "3000.00",
+        })
+        self.assertEqual(report["total"], {
+            "revenue": "9000.00", "nights_sold": 5, "occupancy_rate": round(5 / 270, 4), "adr": "1800.00",
+        })
+
+
+class ExportParamsTests(TestCase):
+    def test_unparseable_dates_are_rejected(self):
+        f = _hotel_fixture(rooms=1)
+        api = _api_as("admin", hotel=f["hotel"], staff=f["staff"])
+
+        for query in ("start=2025-13-01", "start=garbage", "end=garbage"):
+            resp = api.get(f"/api/admin/export/bookings/?{query}")
+            self.assertEqual(resp.status_code, 400, query)
+        self.assertEqual(api.get("/api/admin/export/bookings/?start=2025-01-01").status_code, 200)
+
+
+class SeedFakeDataTests(TestCase):
+    def test_revenue_rollup_matches_bookings(self):
+        call_command("seed_fake_data", hotels=2, rooms_per_hotel=10, clients=10, bookings=60, stdout=StringIO())
+
+        nights = sum(
+            (b.date_end - b.date_start).days + 1
+            for b in Booking.objects.exclude(book_status="Отменен")
+        )
+        self.assertGreater(nights, 0)
+        self.assertEqual(RoomTypeDailyRevenue.objects.aggregate(n=Sum("nights_sold"))["n"], nights)
+
+    def test_window_grows_with_bookings(self):
+        # 2000 броней на 10 номеров не помещаются в окно по умолчанию (--days-back 30)
+        out = StringIO()
+        call_command("seed_fake_data", hotels=1, rooms_per_hotel=10, clients=10, bookings=2000, stdout=out)
+
+        self.assertIn("--days-back 30 is too short", out.getvalue())
+        cancelled = Booking.objects.filter(book_status="Отменен").count()
+        self.assertLess(cancelled / 2000, 0.1)
+
+
+class CleanerBoardTests(TestCase):
+    def test_invalid_date_is_rejected(self):
+        f = _hotel_fixture(rooms=1)
+        api = _api_as("cleaner", hotel=f["hotel"])
+
+        for value in ("2025-02-30", "garbage"):
+            self.assertEqual(api.get(f"/api/cleaner/board/?date={value}").status_code, 400, value)
+        self.assertEqual(api.get("/api/cleaner/board/?date=2025-02-28").status_code, 200)
+
+
+class CleaningsBatchTests(TestCase):
+    def setUp(self):
+        self.f = _hotel_fixture(rooms=3)
+        cleaner_staff = Staff.objects.create(contract=self.f["contract"], full_name="Cleaner", job_title="Уборщик")
+        self.api = _api_as("cleaner", hotel=self.f["hotel"], staff=cleaner_staff)
+        self.rooms = list(RoomInHotel.objects.filter(hotel=self.f["hotel"]).order_by("room_number"))
+
+    def _post(self, statuses, cleaning_time):
+        resp = self.api.post("/api/cleaner/cleanings/batch/", {
+            "date": str(FAR),
+            "items": [
+                {"room": room.id_number, "cleaning_time": cleaning_time, "cleaning_status": st}
+                for room, st in zip(self.rooms, statuses)
+            ],
+        }, format="json")
+        self.assertEqual(resp.status_code, 200)
+        return resp
+
+    def _cleaned(self):
+        return list(RoomInHotel.objects.order_by("room_number").values_list("cleaned", flat=True))
+
+    def test_repost_updates_rows_and_room_flags(self):
+        self._post(["Не убран", "Убран"], "10:00")
+        first = dict(CleaningTime.objects.values_list("room_id", "id_cleaning"))
+        self.assertEqual(self._cleaned(), [False, True, True])
+
+        self._post(["Убран", "Не убран"], "12:30")
+
+        rows = CleaningTime.objects.order_by("room__room_number")
+        self.assertEqual(dict(rows.values_list("room_id", "id_cleaning")), first)
+        self.assertEqual(
+            list(rows.values_list("cleaning_status", "cleaning_time")),
+            [("Убран", time(12, 30)), ("Не убран", time(12, 30))],
+        )
+        # третий номер в пачку не входил и не тронут
+        self.assertEqual(self._cleaned(), [True, False, True])
+
+
+class BenchBookingIndexesTests(TestCase):
+    def test_runs_on_small_database(self):
+        call_command("seed_fake_data", hotels=1, rooms_per_hotel=5, clients=5, bookings=20, stdout=StringIO())
+        out = StringIO()
+        call_command("bench_booking_indexes", bookings=300, repeat=1, stdout=out)
+
+        self.assertIn("AFTER (Booking.Meta.indexes)", out.getvalue())
+        self.assertIn("availability overlap (active):", out.getvalue())
+        # всё откатывается: синтетические брони не остаются
+        self.assertEqual(Booking.objects.count(), 20)
+
+
+class ImageUrlTests(TestCase):
+    def setUp(self):
+        _resolve.cache_clear()
+        self.addCleanup(_resolve.cache_clear)
+        f = _hotel_fixture(rooms=1)
+        TypeOfRoom.objects.filter(pk=f["room_type"].pk).update(image="room_types/standard.jpg")
+
+    def _room_type(self):
+        return APIClient().get("/api/room-types/").data[0]
+
+    def test_image_and_image_url_are_absolute(self):
+        data = self._room_type()
+        self.assertEqual(data["image"], "http://testserver/media/room_types/standard.jpg")
+        self.assertEqual(data["image"], data["image_url"])
+
+    @override_settings(IMAGE_CDN_URL="https://cdn.example.com/")
+    def test_image_follows_cdn(self):
+        data = self._room_type()
+        self.assertEqual(data["image"], "https://cdn.example.com/room_types/standard.jpg")
+        self.assertEqual(data["image"], data["image_url"])
+
+
+class ClientSearchTests(TestCase):
+    def setUp(self):
+        self.ivan = Client.objects.create(
+            name="Иван", surname="Петров", fathers_name="Сергеевич", home_adress="Street 1",
+            mobile_number="+70000000001", email="ivan.petrov@mail.ru",
+        )
+        self.maria = Client.objects.create(
+            name="Мария", surname="Смирнова", home_adress="Street 2",
+            mobile_number="+70000000002", email="maria@test.org",
+        )
+
+    def _search(self, q):
+        return set(filter_by_client_search(Client.objects.all(), q, client_field="pk"))
+
+    def test_word_prefixes(self):
+        cases = {
+            "Иван": {self.ivan},
+            "пет": {self.ivan},
+            "ivan": {self.ivan},          # транслит
+            "smirn": {self.maria},
+            "Петров сергеевич": {self.ivan},  # все слова должны найтись
+            "петров мария": set(),
+            "mail": {self.ivan},          # часть email
+            "test org": {self.maria},
+            "ван": set(),                 # префикс, не подстрока
+        }
+        for q, expected in cases.items():
+            self.assertEqual(self._search(q), expected, q)
+
+    def test_reindex_on_save(self):
+        self.ivan.surname = "Сидоров"
+        self.ivan.save()
+
+        self.assertEqual(self._search("сидоров"), {self.ivan})
+        self.assertEqual(self._search("sidorov"), {self.ivan})
+        self.assertEqual(self._search("петров"), set())
+        # email не менялся, его токены остались
+        self.assertEqual(self._search("petrov"), {self.ivan})
@@ -20,12 +20,14 @@ urlpatterns = [
 
     # admin
     path("api/admin/hotel/", AdminViewSet.as_view({"get": "my_hotel"})),
+    path("api/admin/dashboard/", AdminViewSet.as_view({"get": "dashboard"})),
     path("api/admin/rooms/", AdminViewSet.as_view({"get": "rooms"})),
     path("api/admin/residents/", AdminViewSet.as_view({"get": "residents"})),
     path("api/admin/checkin/", AdminViewSet.as_view({"post": "checkin"})),
     path("api/admin/checkins/<int:pk>/checkout/", AdminViewSet.as_view({"post": "checkout"})),
     path("api/admin/staff/", AdminViewSet.as_view({"post": "add_staff"})),
     path("api/admin/report/quarterly/", AdminViewSet.as_view({"get": "quarterly_report"})),
+    path("api/admin/export/<str:kind>/", AdminViewSet.as_view({"get": "export"})),
 
     path("api/admin/bookings/", AdminBookingsViewSet.as_view({"get": "list"})),
     path("api/admin/bookings/<int:pk>/", AdminBookingsViewSet.as_view({"patch": "partial_update"})),
@@ -43,6 +45,8 @@ urlpatterns = [
     # cleaner
     path("api/cleaner/my-hotel/", CleanerViewSet.as_view({"get": "my_hotel"})),
     path("api/cleaner/rooms/", CleanerViewSet.as_view({"get": "rooms"})),
+    path("api/cleaner/board/", CleanerViewSet.as_view({"get": "board"})),
     path("api/cleaner/cleanings/", CleanerViewSet.as_view({"get": "cleanings", "post": "add_cleaning"})),
+    path("api/cleaner/cleanings/batch/", CleanerViewSet.as_view({"post": "add_cleanings_batch"})),
     path("api/cleaner/cleanings/<int:pk>/", CleanerViewSet.as_view({"delete": "delete_cleaning"})),
 ]
\ No newline at end of file
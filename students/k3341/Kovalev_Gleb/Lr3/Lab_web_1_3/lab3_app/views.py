@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from calendar import monthrange
 from datetime import date, timedelta
 from decimal import Decimal
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Count, Q, Sum, Min
+from django.db.models import Count, DecimalField, Exists, F, Q, Sum, Min, OuterRef, Subquery
 from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags, quote_etag
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -23,7 +28,7 @@ from .serializers import (
     ClientSerializer, StaffSerializer, RoomTypeInHotelSerializer,
     BookingSerializer, BookingCreateSerializer, BookingPaySerializer,
     CheckInSerializer, CheckInCreateSerializer,
-    CleaningSerializer, CleaningCreateSerializer,
+    CleaningSerializer, CleaningCreateSerializer, CleaningBatchSerializer,
     ProfileSerializer, TypeOfRoomSerializer, RoomTypeDetailSerializer,
     BookingAdminListSerializer, BookingAdminUpdateSerializer,
     BookingAdminCheckinSerializer, BookingAdminCheckoutSerializer,
@@ -31,6 +36,18 @@ from .serializers import (
     CleanerListSerializer, CleaningAdminSerializer, CleaningStatusUpdateSerializer
 )
 from .permissions import IsAdmin, IsCleaner, IsClient
+from .authentication import request_profile
+from .compact import CLIENT_COLUMNS, compact_requested, compact_rows, compact_values, side_tables
+from .pagination import KeysetPagination, cursor_requested
+from .search import filter_by_client_search
+from .reports import quarterly_revenue, refresh_revenue_rollup
+from .exports import EXPORT_FORMATS, export_response
+from .availability import (
+    CANCELLED, CHECKED_OUT, CHECKED_IN,
+    ensure_availability, recompute_availability, apply_booking_change,
+    reserve_room_type, ensure_availability_for_pairs,
+    cached_free_rooms,
+)
 
 from django.db.models import Min
 
@@ -50,6 +67,20 @@ def _parse_required(request, name: str) -> date:
     return d
 
 
+def _parse_optional(request, name: str):
+    """Необязательная дата: None, если параметра нет; ValueError, если он не разбирается."""
+    s = request.query_params.get(name)
+    if not s:
+        return None
+    try:
+        d = parse_date(s)
+    except ValueError:
+        d = None
+    if not d:
+        raise ValueError(f"Invalid date param: {name}")
+    return d
+
+
 def _quarter_range(year: int, quarter: int):
     if quarter not in (1, 2, 3, 4):
         raise ValueError("quarter must be 1..4")
@@ -66,43 +97,70 @@ def overlaps_checkin(qs, start, end):
 
 
 def admin_hotel(request):
-    return getattr(request.user.profile, "hotel", None)
+    return getattr(request_profile(request), "hotel", None)
 
 
 def client_obj(request):
-    return getattr(request.user.profile, "client", None)
-
+    return getattr(request_profile(request), "client", None)
 
-def daterange(start: date, end: date):
-    cur = start
-    while cur <= end:
-        yield cur
-        cur += timedelta(days=1)
 
-
-def ensure_availability(hotel: Hotel, room_type: TypeOfRoom, start: date, end: date):
+def _hotel_dashboard(hotel, today: date) -> dict:
     """
-    Создаёт/инициализирует строки доступности по дням.
-    free_rooms = total_rooms_in_hotel_for_type - bookings_overlapping_that_day (кроме отменённых).
+    Сводка для /api/admin/dashboard/ за два запроса с условной агрегацией:
+    номера группируются по типу (итоги по отелю складываются в Python),
+    брони отеля сворачиваются в один aggregate().
     """
-    total = RoomInHotel.objects.filter(hotel=hotel, room_type=room_type).count()
-
-    for d in daterange(start, end):
-        obj, created = RoomTypeAvailability.objects.get_or_create(
-            hotel=hotel,
-            room_type=room_type,
-            day=d,
-            defaults={"free_rooms": total},
+    by_type = (
+        RoomInHotel.objects.filter(hotel=hotel)
+        .values("room_type_id", "room_type__name")
+        .annotate(
+            total=Count("id_number"),
+            occupied=Count("id_number", filter=Q(status="Занят")),
+            cleaned=Count("id_number", filter=Q(cleaned=True)),
+        )
+        .order_by("room_type_id")
+    )
+
+    room_types = []
+    rooms = {"total": 0, "free": 0, "occupied": 0, "cleaned": 0, "not_cleaned": 0}
+    for r in by_type:
+        room_types.append({
+            "room_type_id": r["room_type_id"],
+            "name": r["room_type__name"],
+            "total": r["total"],
+            "occupied": r["occupied"],
+            "occupancy": round(r["occupied"] / r["total"], 4) if r["total"] else 0,
+        })
+        rooms["total"] += r["total"]
+        rooms["occupied"] += r["occupied"]
+        rooms["cleaned"] += r["cleaned"]
+    rooms["free"] = rooms["total"] - rooms["occupied"]
+    rooms["not_cleaned"] = rooms["total"] - rooms["cleaned"]
+
+    debt = F("price") - F("payed")
+    bookings = (
+        Booking.objects.filter(hotel=hotel)
+        .exclude(book_status=CANCELLED)
+        .aggregate(
+            arrivals_today=Count("id_book", filter=Q(date_start=today)),
+            departures_today=Count("id_book", filter=Q(date_end=today)),
+            in_house=Count("id_book", filter=Q(book_status=CHECKED_IN)),
+            unpaid_bookings=Count("id_book", filter=Q(payed__lt=F("price"))),
+            outstanding=Sum(debt, filter=Q(payed__lt=F("price")), output_field=DecimalField(max_digits=12, decimal_places=2)),
         )
-        if created:
-            occupied = Booking.objects.filter(
-                hotel=hotel,
-                room_type=room_type,
-                date_start__lte=d,
-                date_end__gte=d,
-            ).exclude(book_status="Отменен").count()
-            obj.free_rooms = max(total - occupied, 0)
-            obj.save(update_fields=["free_rooms"])
+    )
+    outstanding = {
+        "bookings": bookings.pop("unpaid_bookings"),
+        "amount": str(Decimal(bookings.pop("outstanding") or 0).quantize(Decimal("0.01"))),
+    }
+
+    return {
+        "date": today.isoformat(),
+        "rooms": rooms,
+        "bookings": bookings,
+        "outstanding_payments": outstanding,
+        "room_types": room_types,
+    }
 
 
 class SmallPagination(PageNumberPagination):
@@ -111,55 +169,33 @@ class SmallPagination(PageNumberPagination):
     max_page_size = 100
 
 
-CANCELLED = "Отменен"
-CHECKED_OUT = "Выселен"
-CHECKED_IN = "Заселен"
-
-
-def _daterange(start, end):
-    cur = start
-    while cur <= end:
-        yield cur
-        cur += timedelta(days=1)
+def _paginate_values(paginator, qs, columns, request):
+    # keyset-пагинатору нужны columns, чтобы достать курсор из кортежа values_list
+    if isinstance(paginator, KeysetPagination):
+        return paginator.paginate_queryset(compact_values(qs, columns), request, columns=columns)
+    return paginator.paginate_queryset(compact_values(qs, columns), request)
 
 
-def _recompute_availability(hotel, room_type, start, end):
+def _with_room_number(qs):
     """
-    Надёжный пересчёт free_rooms по дням на отрезке [start..end].
-    free_rooms = total_rooms - active_bookings_count(day)
+    Номер комнаты из последнего checkin брони одной Subquery-аннотацией,
+    чтобы BookingAdminListSerializer не ходил в базу на каждую бронь.
     """
-    total = RoomInHotel.objects.filter(hotel=hotel, room_type=room_type).count()
-
-    for d in _daterange(start, end):
-        occupied = (
-            Booking.objects.filter(
-                hotel=hotel,
-                room_type=room_type,
-                date_start__lte=d,
-                date_end__gte=d,
-            )
-            .exclude(book_status__in=[CANCELLED, CHECKED_OUT])
-            .count()
-        )
-
-        obj, _ = RoomTypeAvailability.objects.get_or_create(
-            hotel=hotel,
-            room_type=room_type,
-            day=d,
-            defaults={"free_rooms": max(total - occupied, 0)},
-        )
-        new_free = max(total - occupied, 0)
-        if obj.free_rooms != new_free:
-            obj.free_rooms = new_free
-            obj.save(update_fields=["free_rooms"])
+    latest = (
+        CheckIn.objects
+        .filter(booking=OuterRef("pk"))
+        .order_by("-id_check_in")
+        .values("room__room_number")[:1]
+    )
+    return qs.annotate(latest_room_number=Subquery(latest))
 
 
 def _admin_hotel(request):
-    return getattr(request.user.profile, "hotel", None)
+    return getattr(request_profile(request), "hotel", None)
 
 
 def _admin_staff(request):
-    return getattr(request.user.profile, "staff", None)
+    return getattr(request_profile(request), "staff", None)
 
 
 def _room_is_free_for_period(room, start, end):
@@ -170,6 +206,70 @@ def _room_is_free_for_period(room, start, end):
         date_check_out__gte=start,
     ).exists()
 
+# колонки компактного режима (?compact=1), см. compact.py
+RESIDENT_COLUMNS = {
+    "id_check_in": "id_check_in",
+    "date_check_in": "date_check_in",
+    "date_check_out": "date_check_out",
+    **CLIENT_COLUMNS,
+    "room_id": "room_id",
+    "room_number": "room__room_number",
+    "room_status": "room__status",
+    "room_cleaned": "room__cleaned",
+    "room_type_id": "room__room_type_id",
+    "staff_id": "staff_id",
+    "staff_full_name": "staff__full_name",
+    "booking_id": "booking_id",
+    "book_status": "booking__book_status",
+    "date_start": "booking__date_start",
+    "date_end": "booking__date_end",
+    "price": "booking__price",
+    "payed": "booking__payed",
+    "type_of_payment": "booking__type_of_payment",
+    "hotel_id": "booking__hotel_id",
+}
+
+BOOKING_COLUMNS = {
+    "id_book": "id_book",
+    "book_status": "book_status",
+    "date_start": "date_start",
+    "date_end": "date_end",
+    "hotel_id": "hotel_id",
+    "room_type_id": "room_type_id",
+    "price": "price",
+    "payed": "payed",
+    "type_of_payment": "type_of_payment",
+}
+
+# строка доски уборки (CleanerViewSet.board), поля — аннотации из board()
+BOARD_COLUMNS = {
+    "room_id": "id_number",
+    "room_number": "room_number",
+    "room_type_id": "room_type_id",
+    "room_type": "room_type__name",
+    "status": "status",
+    "cleaned": "cleaned",
+    "occupied": "occupied",
+    "checkout_today": "checkout_today",
+    "cleaning_id": "cleaning_id",
+    "cleaning_time": "cleaning_time",
+    "cleaning_status": "cleaning_status",
+    "cleaner_id": "cleaner_id",
+    "cleaner_name": "cleaner_name",
+}
+
+CLEANING_COLUMNS = {
+    "id_cleaning": "id_cleaning",
+    "date": "date",
+    "cleaning_time": "cleaning_time",
+    "cleaning_status": "cleaning_status",
+    "room_id": "room_id",
+    "room_number": "room__room_number",
+    "room_type_id": "room__room_type_id",
+    "staff_id": "staff_id",
+    "staff_name": "staff__full_name",
+}
+
 # --------------------
 # HOTEL endpoints (public read + admin update for images)
 # --------------------
@@ -182,6 +282,8 @@ class HotelViewSet(viewsets.ModelViewSet):
       GET /api/hotels/{id}/room-types/
       GET /api/hotels/{id}/room-types/{type_id}/
       GET /api/hotels/{id}/room-types/{type_id}/availability?start=...&end=...
+      GET /api/hotels/search/?city=...&start=...&end=...&guests=...
+      GET /api/hotels/{id}/calendar/?month=YYYY-MM | ?year=...&quarter=...  [&type_id=...]
     Client (auth client):
       POST /api/hotels/{id}/room-types/{type_id}/book  {date_start, date_end, type_of_payment?}
     Admin:
@@ -195,7 +297,8 @@ class HotelViewSet(viewsets.ModelViewSet):
         # public read endpoints
         if self.action in (
             "list", "retrieve", "room_types", "rooms",
-            "room_type_detail", "room_type_availability",
+            "room_type_detail", "room_type_availability", "search",
+            "calendar",
         ):
             return [AllowAny()]
 
@@ -272,12 +375,7 @@ class HotelViewSet(viewsets.ModelViewSet):
         if not RoomInHotel.objects.filter(hotel=hotel, room_type=room_type).exists():
             return Response({"detail": "this room type is not available in this hotel"}, status=400)
 
-        ensure_availability(hotel, room_type, start, end)
-
-        days_qs = RoomTypeAvailability.objects.filter(
-            hotel=hotel, room_type=room_type, day__range=(start, end)
-        )
-        min_free = days_qs.aggregate(m=Min("free_rooms"))["m"]
+        min_free = min(cached_free_rooms(hotel, room_type, start, end))
 
         return Response({
             "hotel_id": hotel.id_hotel,
@@ -287,6 +385,136 @@ class HotelViewSet(viewsets.ModelViewSet):
             "can_book": bool(min_free and min_free > 0),
         })
 
+    # ---------- calendar: free_rooms per day for a month/quarter ----------
+
+    @action(detail=True, methods=["get"], url_path="calendar")
+    def calendar(self, request, pk=None):
+        hotel = self.get_object()
+
+        try:
+            if request.query_params.get("quarter"):
+                start, end = _quarter_range(
+                    int(request.query_params.get("year") or date.today().year),
+                    int(request.query_params["quarter"]),
+                )
+            else:
+                month = request.query_params.get("month")
+                first = parse_date(f"{month}-01") if month else date.today().replace(day=1)
+                if not first:
+                    raise ValueError("month must be YYYY-MM")
+                start = first
+                end = first.replace(day=monthrange(first.year, first.month)[1])
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        rooms = RoomInHotel.objects.filter(hotel=hotel)
+        type_id = request.query_params.get("type_id")
+        if type_id:
+            try:
+                rooms = rooms.filter(room_type_id=int(type_id))
+            except ValueError:
+                return Response({"detail": "type_id must be int"}, status=400)
+
+        type_ids = sorted(set(rooms.values_list("room_type_id", flat=True)))
+        ensure_availability_for_pairs([(hotel.id_hotel, t) for t in type_ids], start, end)
+
+        # один запрос по диапазону, дальше раскладываем в массивы по смещению дня
+        n = (end - start).days + 1
+        vectors = {t: [None] * n for t in type_ids}
+        rows = (
+            RoomTypeAvailability.objects
+            .filter(hotel=hotel, room_type_id__in=type_ids, day__range=(start, end))
+            .values_list("room_type_id", "day", "free_rooms")
+        )
+        for t, d, free in rows:
+            vectors[t][(d - start).days] = free
+
+        payload = {
+            "hotel_id": hotel.id_hotel,
+            "start": str(start),
+            "end": str(end),
+            "room_types": [{"room_type_id": t, "free_rooms": vectors[t]} for t in type_ids],
+        }
+
+        # ETag по содержимому: неизменившийся календарь отдаём как 304 без тела
+        etag = quote_etag(hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest())
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            return Response(status=304, headers={"ETag": etag})
+
+        return Response(payload, headers={"ETag": etag})
+
+    # ---------- search: all hotels/types of a city with free rooms ----------
+
+    @action(detail=False, methods=["get"], url_path="search")
+    def search(self, request):
+        city = (request.query_params.get("city") or "").strip()
+        if not city:
+            return Response({"detail": "city is required"}, status=400)
+
+        try:
+            start = _parse_required(request, "start")
+            end = _parse_required(request, "end")
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        if end < start:
+            return Response({"detail": "end must be >= start"}, status=400)
+
+        if (end - start).days > 60:
+            return Response({"detail": "max search period is 60 days"}, status=400)
+
+        try:
+            guests = int(request.query_params.get("guests") or 1)
+        except ValueError:
+            return Response({"detail": "guests must be int"}, status=400)
+
+        rooms = RoomInHotel.objects.filter(hotel__city__iexact=city, room_type__num_of_places__gte=guests)
+        ensure_availability_for_pairs(rooms.values_list("hotel_id", "room_type_id").distinct(), start, end)
+
+        nights = (end - start).days + 1
+        total_rooms = (
+            RoomInHotel.objects
+            .filter(hotel=OuterRef("hotel"), room_type=OuterRef("room_type"))
+            .values("hotel")
+            .annotate(c=Count("id_number"))
+            .values("c")
+        )
+        rows = (
+            RoomTypeAvailability.objects
+            .filter(hotel__city__iexact=city, room_type__num_of_places__gte=guests, day__range=(start, end))
+            .values(
+                "hotel_id", "hotel__name", "hotel__address",
+                "room_type_id", "room_type__name", "room_type__num_of_places", "room_type__base_price",
+            )
+            .annotate(
+                days=Count("id"),
+                min_free_rooms=Min("free_rooms"),
+                total_rooms=Subquery(total_rooms),
+            )
+            .filter(days=nights, min_free_rooms__gt=0)
+            .order_by("room_type__base_price", "hotel__name")
+        )
+
+        return Response({
+            "city": city,
+            "period": {"start": str(start), "end": str(end)},
+            "guests": guests,
+            "results": [
+                {
+                    "hotel_id": r["hotel_id"],
+                    "hotel_name": r["hotel__name"],
+                    "address": r["hotel__address"],
+                    "room_type_id": r["room_type_id"],
+                    "room_type_name": r["room_type__name"],
+                    "num_of_places": r["room_type__num_of_places"],
+                    "base_price": r["room_type__base_price"],
+                    "total_rooms": r["total_rooms"],
+                    "min_free_rooms": r["min_free_rooms"],
+                }
+                for r in rows
+            ],
+        })
+
     # ---------- NEW: create booking (decrease availability per day) ----------
 
     @action(detail=True, methods=["post"], url_path=r"room-types/(?P<type_id>\d+)/book")
@@ -318,28 +546,17 @@ class HotelViewSet(viewsets.ModelViewSet):
 
         pay_type = request.data.get("type_of_payment", "Карта")
 
-        ensure_availability(hotel, room_type, start, end)
-
-        # lock days
-        days_qs = RoomTypeAvailability.objects.select_for_update().filter(
-            hotel=hotel, room_type=room_type, day__range=(start, end)
-        )
-        expected = (end - start).days + 1
-        if days_qs.count() != expected:
-            return Response({"detail": "availability rows mismatch"}, status=400)
-
-        min_free = days_qs.aggregate(m=Min("free_rooms"))["m"]
-        if not min_free or min_free <= 0:
-            return Response({"detail": "No free rooms for this period"}, status=400)
-
-        for row in days_qs:
-            row.free_rooms -= 1
-            row.save(update_fields=["free_rooms"])
-
         staff = Staff.objects.filter(job_title="Администратор").first()
         if not staff:
             return Response({"detail": "No staff with job_title='Администратор' exists"}, status=400)
 
+        ensure_availability(hotel, room_type, start, end)
+
+        # атомарно списываем по номеру на каждую ночь (один UPDATE)
+        if not reserve_room_type(hotel, room_type, start, end):
+            transaction.set_rollback(True)
+            return Response({"detail": "No free rooms for this period"}, status=400)
+
         nights = (end - start).days + 1
         price = Decimal(nights * room_type.base_price)
 
@@ -355,6 +572,7 @@ class HotelViewSet(viewsets.ModelViewSet):
             payed=Decimal("0.00"),
             type_of_payment=pay_type,
         )
+        refresh_revenue_rollup(hotel, room_type, start, end)
 
         return Response(
             BookingSerializer(booking, context={"request": request}).data,
@@ -396,14 +614,23 @@ class ClientViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"], url_path="me")
     def me(self, request):
-        return Response(ProfileSerializer(request.user.profile).data)
+        return Response(ProfileSerializer(request_profile(request)).data)
 
     @action(detail=False, methods=["get"], url_path="my-bookings")
     def my_bookings(self, request):
         cl = client_obj(request)
         if not cl:
             return Response({"detail": "profile.client is not set"}, status=400)
-        qs = Booking.objects.select_related("room_type", "staff").filter(client=cl).order_by("-date_start")
+        qs = Booking.objects.select_related("room_type", "staff", "hotel", "client").filter(client=cl).order_by("-date_start")
+
+        if compact_requested(request):
+            items = compact_rows(qs, {**BOOKING_COLUMNS, "staff_id": "staff_id", "staff_full_name": "staff__full_name"})
+            return Response({
+                "client": ClientSerializer(cl).data,
+                "items": items,
+                **side_tables(request, items),
+            })
+
         return Response(BookingSerializer(qs, many=True, context={"request": request}).data)
 
     @action(detail=False, methods=["post"], url_path="book")
@@ -438,6 +665,7 @@ class ClientViewSet(viewsets.ViewSet):
         if hasattr(booking, "hotel_id"):
             booking.hotel = hotel
             booking.save(update_fields=["hotel"])
+        refresh_revenue_rollup(hotel, room_type, start, end)
 
         return Response(BookingSerializer(booking, context={"request": request}).data, status=201)
 
@@ -497,24 +725,20 @@ class ClientViewSet(viewsets.ViewSet):
 
         hotel = booking.hotel
         room_type = booking.room_type
-
-        # вернём доступность на каждый день (если строки есть)
-        days = list(daterange(booking.date_start, booking.date_end))
-        qs = RoomTypeAvailability.objects.select_for_update().filter(
-            hotel=hotel,
-            room_type=room_type,
-            day__in=days
-        )
-
-        total = RoomInHotel.objects.filter(hotel=hotel, room_type=room_type).count()
-
-        for row in qs:
-            row.free_rooms = min(row.free_rooms + 1, total)
-            row.save(update_fields=["free_rooms"])
+        old_status = booking.book_status
 
         booking.book_status = "Отменен"
         booking.save(update_fields=["book_status"])
 
+        # вернём доступность по броням (на овербукнутых днях она остаётся 0)
+        apply_booking_change(
+            hotel,
+            room_type,
+            (booking.date_start, booking.date_end, old_status),
+            (booking.date_start, booking.date_end, booking.book_status),
+        )
+        refresh_revenue_rollup(hotel, room_type, booking.date_start, booking.date_end)
+
         return Response(BookingSerializer(booking, context={"request": request}).data)
 
 
@@ -532,6 +756,19 @@ class AdminViewSet(viewsets.ViewSet):
             return Response({"detail": "profile.hotel is not set for admin"}, status=400)
         return Response(HotelSerializer(hotel, context={"request": request}).data)
 
+    @action(detail=False, methods=["get"], url_path="dashboard")
+    def dashboard(self, request):
+        hotel = admin_hotel(request)
+        if not hotel:
+            return Response({"detail": "profile.hotel is not set for admin"}, status=400)
+
+        key = f"dashboard:{hotel.pk}:{date.today()}"
+        data = cache.get(key)
+        if data is None:
+            data = _hotel_dashboard(hotel, date.today())
+            cache.set(key, data, timeout=getattr(settings, "DASHBOARD_CACHE_TTL", 30))
+        return Response(data)
+
     @action(detail=False, methods=["get"], url_path="rooms")
     def rooms(self, request):
         hotel = admin_hotel(request)
@@ -566,7 +803,7 @@ class AdminViewSet(viewsets.ViewSet):
                 pass
 
         # ---- pagination ----
-        paginator = SmallPagination()
+        paginator = KeysetPagination(("room_number",)) if cursor_requested(request) else SmallPagination()
         page = paginator.paginate_queryset(qs, request)
         ser = RoomShortSerializer(page, many=True, context={"request": request})
         return paginator.get_paginated_response(ser.data)
@@ -578,11 +815,19 @@ class AdminViewSet(viewsets.ViewSet):
             return Response({"detail": "profile.hotel is not set for admin"}, status=400)
 
         today = date.today()
-        qs = CheckIn.objects.select_related("client", "room", "room__room_type", "booking", "staff").filter(
+        qs = CheckIn.objects.select_related(
+            "client", "room", "room__room_type", "staff",
+            "booking", "booking__hotel", "booking__client", "booking__staff", "booking__room_type",
+        ).filter(
             room__hotel=hotel,
             date_check_in__lte=today,
             date_check_out__gte=today
         ).order_by("room__room_number")
+
+        if compact_requested(request):
+            items = compact_rows(qs, RESIDENT_COLUMNS)
+            return Response({"items": items, **side_tables(request, items)})
+
         return Response(CheckInSerializer(qs, many=True).data)
 
     @action(detail=False, methods=["post"], url_path="checkin")
@@ -655,6 +900,72 @@ class AdminViewSet(viewsets.ViewSet):
         obj = ser.save()
         return Response(StaffSerializer(obj).data, status=201)
 
+    @action(detail=False, methods=["get"], url_path="report/quarterly")
+    def quarterly_report(self, request):
+        """
+        GET /api/admin/report/quarterly/?year=2025&quarter=1 (по умолчанию — текущий квартал)
+        Читает дневные срезы RoomTypeDailyRevenue, а не брони.
+        """
+        hotel = admin_hotel(request)
+        if not hotel:
+            return Response({"detail": "profile.hotel is not set for admin"}, status=400)
+
+        today = date.today()
+        try:
+            year = int(request.query_params.get("year") or today.year)
+            quarter = int(request.query_params.get("quarter") or (today.month - 1) // 3 + 1)
+            start, end = _quarter_range(year, quarter)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return Response({"year": year, "quarter": quarter, **quarterly_revenue(hotel, start, end)})
+
+    @action(detail=False, methods=["get"], url_path=r"export/(?P<kind>[\w-]+)")
+    def export(self, request, kind=None):
+        """
+        GET /api/admin/export/{bookings|checkins|cleanings}/?start=&end=&fmt=csv|ndjson
+        Полная история отеля потоком (?format занят DRF, поэтому ?fmt).
+        """
+        hotel = admin_hotel(request)
+        if not hotel:
+            return Response({"detail": "profile.hotel is not set for admin"}, status=400)
+
+        fmt = request.query_params.get("fmt") or "csv"
+        if fmt not in EXPORT_FORMATS:
+            return Response({"detail": f"fmt must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+        try:
+            start = _parse_optional(request, "start")
+            end = _parse_optional(request, "end")
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        if kind == "bookings":
+            qs = _with_room_number(Booking.objects.filter(hotel=hotel)).order_by("id_book")
+            columns = {**BOOKING_COLUMNS, **CLIENT_COLUMNS, "room_number": "latest_room_number"}
+            if start:
+                qs = qs.filter(date_end__gte=start)
+            if end:
+                qs = qs.filter(date_start__lte=end)
+        elif kind == "checkins":
+            qs = CheckIn.objects.filter(room__hotel=hotel).order_by("id_check_in")
+            columns = RESIDENT_COLUMNS
+            if start:
+                qs = qs.filter(date_check_out__gte=start)
+            if end:
+                qs = qs.filter(date_check_in__lte=end)
+        elif kind == "cleanings":
+            qs = CleaningTime.objects.filter(room__hotel=hotel).order_by("date", "cleaning_time", "id_cleaning")
+            columns = CLEANING_COLUMNS
+            if start:
+                qs = qs.filter(date__gte=start)
+            if end:
+                qs = qs.filter(date__lte=end)
+        else:
+            return Response({"detail": "unknown export, use bookings/checkins/cleanings"}, status=404)
+
+        return export_response(qs, columns, fmt, f"{kind}-hotel-{hotel.pk}")
+
 class AdminBookingsViewSet(viewsets.ViewSet):
     """
     /api/admin/bookings/  (GET)  — список броней по отелю админа (без Отменен/Выселен)
@@ -671,7 +982,7 @@ class AdminBookingsViewSet(viewsets.ViewSet):
             return Response({"detail": "profile.hotel is not set for admin"}, status=400)
 
         qs = (
-            Booking.objects.select_related("client", "room_type", "hotel")
+            _with_room_number(Booking.objects.select_related("client", "room_type", "hotel"))
             .filter(hotel=hotel)
             .exclude(book_status__in=[CANCELLED, CHECKED_OUT])
             .order_by("-id_book")
@@ -696,16 +1007,23 @@ class AdminBookingsViewSet(viewsets.ViewSet):
         elif end:
             qs = qs.filter(date_start__lte=end)
 
-        # client search
+        # client search: префиксы слов по индексу ClientSearchToken
         q = request.query_params.get("q")
         if q:
-            qs = qs.filter(
-                Q(client__name__icontains=q) |
-                Q(client__surname__icontains=q) |
-                Q(client__email__icontains=q)
-            )
+            qs = filter_by_client_search(qs, q)
+
+        if cursor_requested(request):
+            paginator = KeysetPagination(("-id_book",))
+        else:
+            paginator = self.pagination_class()
+
+        if compact_requested(request):
+            columns = {**BOOKING_COLUMNS, **CLIENT_COLUMNS, "room_number": "latest_room_number"}
+            items = compact_rows(_paginate_values(paginator, qs, columns, request), columns)
+            resp = paginator.get_paginated_response(items)
+            resp.data.update(side_tables(request, items))
+            return resp
 
-        paginator = self.pagination_class()
         page = paginator.paginate_queryset(qs, request)
         ser = BookingAdminListSerializer(page, many=True, context={"request": request})
         return paginator.get_paginated_response(ser.data)
@@ -716,7 +1034,7 @@ class AdminBookingsViewSet(viewsets.ViewSet):
         if not hotel:
             return Response({"detail": "profile.hotel is not set for admin"}, status=400)
 
-        booking = Booking.objects.select_related("hotel", "room_type").filter(pk=pk, hotel=hotel).first()
+        booking = _with_room_number(Booking.objects.select_related("hotel", "room_type", "client")).filter(pk=pk, hotel=hotel).first()
         if not booking:
             return Response({"detail": "booking not found"}, status=404)
 
@@ -744,15 +1062,17 @@ class AdminBookingsViewSet(viewsets.ViewSet):
 
         booking = ser.save()
 
-        # если поменяли даты — пересчитываем доступность по старому и новому диапазону
-        if booking.date_start != old_start or booking.date_end != old_end:
-            # проверка: достаточно ли свободных по типу на новый период
-            # (по наличию комнат и активных броней)
-            _recompute_availability(hotel, booking.room_type, min(old_start, booking.date_start), max(old_end, booking.date_end))
-
-        # если поменяли статус на "Отменен" — пересчёт availability
-        if old_status != booking.book_status:
-            _recompute_availability(hotel, booking.room_type, booking.date_start, booking.date_end)
+        # availability меняем только на днях, где бронь появилась или пропала
+        # (сдвиг дат и/или смена статуса, например на "Отменен")
+        apply_booking_change(
+            hotel,
+            booking.room_type,
+            (old_start, old_end, old_status),
+            (booking.date_start, booking.date_end, booking.book_status),
+        )
+        refresh_revenue_rollup(
+            hotel, booking.room_type, min(old_start, booking.date_start), max(old_end, booking.date_end)
+        )
 
         return Response(BookingAdminListSerializer(booking, context={"request": request}).data)
 
@@ -808,7 +1128,9 @@ class AdminBookingsViewSet(viewsets.ViewSet):
         room.save(update_fields=["status", "cleaned"])
 
         # пересчёт availability по типу на период
-        _recompute_availability(hotel, booking.room_type, booking.date_start, booking.date_end)
+        recompute_availability(hotel, booking.room_type, booking.date_start, booking.date_end)
+
+        booking.latest_room_number = room.room_number
 
         return Response({
             "booking": BookingAdminListSerializer(booking, context={"request": request}).data,
@@ -852,7 +1174,9 @@ class AdminBookingsViewSet(viewsets.ViewSet):
         booking.save(update_fields=["book_status"])
 
         # availability по типу на период брони
-        _recompute_availability(hotel, booking.room_type, booking.date_start, booking.date_end)
+        recompute_availability(hotel, booking.room_type, booking.date_start, booking.date_end)
+
+        booking.latest_room_number = room.room_number
 
         return Response({
             "booking": BookingAdminListSerializer(booking, context={"request": request}).data,
@@ -936,8 +1260,13 @@ class AdminBookingsViewSet(viewsets.ViewSet):
                 booking.save(update_fields=["payed"])
 
         # availability пересчитать по старому и новому типу (на всякий)
-        _recompute_availability(hotel, old_type, booking.date_start, booking.date_end)
-        _recompute_availability(hotel, booking.room_type, booking.date_start, booking.date_end)
+        recompute_availability(hotel, old_type, booking.date_start, booking.date_end)
+        recompute_availability(hotel, booking.room_type, booking.date_start, booking.date_end)
+        if old_type.id_type != new_type.id_type:
+            refresh_revenue_rollup(hotel, old_type, booking.date_start, booking.date_end)
+            refresh_revenue_rollup(hotel, new_type, booking.date_start, booking.date_end)
+
+        booking.latest_room_number = new_room.room_number
 
         return Response({
             "detail": "Room changed",
@@ -1065,7 +1394,17 @@ class AdminStaffViewSet(viewsets.ViewSet):
         if staff_id:
             qs = qs.filter(staff_id=staff_id)
 
-        paginator = self.pagination_class()
+        if cursor_requested(request):
+            paginator = KeysetPagination(("-date", "-cleaning_time", "id_cleaning"))
+        else:
+            paginator = self.pagination_class()
+
+        if compact_requested(request):
+            items = compact_rows(_paginate_values(paginator, qs, CLEANING_COLUMNS, request), CLEANING_COLUMNS)
+            resp = paginator.get_paginated_response(items)
+            resp.data.update(side_tables(request, items, hotel_key=None))
+            return resp
+
         page = paginator.paginate_queryset(qs, request)
         ser = CleaningAdminSerializer(page, many=True, context={"request": request})
         return paginator.get_paginated_response(ser.data)
@@ -1101,14 +1440,14 @@ class CleanerViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"], url_path="my-hotel")
     def my_hotel(self, request):
-        hotel = request.user.profile.hotel
+        hotel = getattr(request_profile(request), "hotel", None)
         if not hotel:
             return Response({"detail": "profile.hotel is not set for cleaner"}, status=400)
         return Response(HotelSerializer(hotel, context={"request": request}).data)
 
     @action(detail=False, methods=["get"], url_path="rooms")
     def rooms(self, request):
-        hotel = request.user.profile.hotel
+        hotel = getattr(request_profile(request), "hotel", None)
         if not hotel:
             return Response({"detail": "profile.hotel is not set for cleaner"}, status=400)
 
@@ -1121,13 +1460,48 @@ class CleanerViewSet(viewsets.ViewSet):
         )
         return Response(RoomShortSerializer(qs, many=True, context={"request": request}).data)
 
+    @action(detail=False, methods=["get"], url_path="board")
+    def board(self, request):
+        """
+        GET /api/cleaner/board/?date=YYYY-MM-DD (по умолчанию сегодня)
+        Все номера отеля на день: занятость, cleaned, уборка за день и выезд
+        сегодня — одним запросом с аннотациями, плоскими строками без вложенных типов.
+        """
+        hotel = getattr(request_profile(request), "hotel", None)
+        if not hotel:
+            return Response({"detail": "profile.hotel is not set for cleaner"}, status=400)
+
+        try:
+            d = _parse_optional(request, "date") or date.today()
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        stays = CheckIn.objects.filter(room=OuterRef("pk"))
+        cleaning = CleaningTime.objects.filter(room=OuterRef("pk"), date=d)
+        qs = (
+            RoomInHotel.objects
+            .filter(hotel=hotel)
+            .annotate(
+                occupied=Exists(stays.filter(date_check_in__lte=d, date_check_out__gte=d)),
+                checkout_today=Exists(stays.filter(date_check_out=d)),
+                cleaning_id=Subquery(cleaning.values("id_cleaning")[:1]),
+                cleaning_time=Subquery(cleaning.values("cleaning_time")[:1]),
+                cleaning_status=Subquery(cleaning.values("cleaning_status")[:1]),
+                cleaner_id=Subquery(cleaning.values("staff_id")[:1]),
+                cleaner_name=Subquery(cleaning.values("staff__full_name")[:1]),
+            )
+            .order_by("room_number")
+        )
+
+        return Response({"date": str(d), "rooms": compact_rows(qs, BOARD_COLUMNS)})
+
     @action(detail=False, methods=["get"], url_path="cleanings")
     def cleanings(self, request):
-        hotel = request.user.profile.hotel
+        hotel = getattr(request_profile(request), "hotel", None)
         if not hotel:
             return Response({"detail": "profile.hotel is not set for cleaner"}, status=400)
 
-        d = parse_date(request.query_params.get("date")) or date.today()
+        d = parse_date(request.query_params.get("date") or "") or date.today()
 
         qs = (
             CleaningTime.objects
@@ -1136,6 +1510,10 @@ class CleanerViewSet(viewsets.ViewSet):
             .order_by("-cleaning_time")
         )
 
+        if compact_requested(request):
+            items = compact_rows(qs, CLEANING_COLUMNS)
+            return Response({"date": str(d), "items": items, **side_tables(request, items, hotel_key=None)})
+
         return Response({
             "date": str(d),
             "items": CleaningSerializer(qs, many=True, context={"request": request}).data
@@ -1143,11 +1521,11 @@ class CleanerViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["post"], url_path="cleanings")
     def add_cleaning(self, request):
-        hotel = request.user.profile.hotel
+        hotel = getattr(request_profile(request), "hotel", None)
         if not hotel:
             return Response({"detail": "profile.hotel is not set for cleaner"}, status=400)
 
-        staff = getattr(request.user.profile, "staff", None)
+        staff = getattr(request_profile(request), "staff", None)
         if not staff:
             return Response({"detail": "profile.staff is not set for this user"}, status=400)
 
@@ -1177,9 +1555,65 @@ class CleanerViewSet(viewsets.ViewSet):
 
         return Response(CleaningSerializer(obj, context={"request": request}).data, status=201 if created else 200)
 
+    @action(detail=False, methods=["post"], url_path="cleanings/batch")
+    @transaction.atomic
+    def add_cleanings_batch(self, request):
+        """
+        POST /api/cleaner/cleanings/batch/
+        {"date": "YYYY-MM-DD" (по умолчанию сегодня), "items": [{"room", "cleaning_time", "cleaning_status"}, ...]}
+        Весь этаж одним запросом: проверка номеров, upsert CleaningTime по (room, date)
+        и room.cleaned двумя UPDATE — в одной транзакции.
+        """
+        hotel = getattr(request_profile(request), "hotel", None)
+        if not hotel:
+            return Response({"detail": "profile.hotel is not set for cleaner"}, status=400)
+
+        staff = getattr(request_profile(request), "staff", None)
+        if not staff:
+            return Response({"detail": "profile.staff is not set for this user"}, status=400)
+
+        ser = CleaningBatchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        d = ser.validated_data.get("date") or date.today()
+        items = ser.validated_data["items"]
+
+        room_ids = [i["room"] for i in items]
+        found = set(RoomInHotel.objects.filter(hotel=hotel, id_number__in=room_ids).values_list("id_number", flat=True))
+        missing = [r for r in room_ids if r not in found]
+        if missing:
+            return Response({"detail": "rooms are not in your hotel", "rooms": missing}, status=400)
+
+        CleaningTime.objects.bulk_create(
+            [
+                CleaningTime(
+                    room_id=i["room"],
+                    date=d,
+                    staff=staff,
+                    cleaning_time=i["cleaning_time"],
+                    cleaning_status=i["cleaning_status"],
+                )
+                for i in items
+            ],
+            update_conflicts=True,
+            unique_fields=["room", "date"],
+            update_fields=["staff", "cleaning_time", "cleaning_status"],
+        )
+
+        # room.cleaned как в add_cleaning: "Убран" -> True, иначе False
+        cleaned = [i["room"] for i in items if i["cleaning_status"] == "Убран"]
+        dirty = [i["room"] for i in items if i["cleaning_status"] != "Убран"]
+        if cleaned:
+            RoomInHotel.objects.filter(id_number__in=cleaned).update(cleaned=True)
+        if dirty:
+            RoomInHotel.objects.filter(id_number__in=dirty).update(cleaned=False)
+
+        # pk после upsert (update_conflicts) не возвращаются — перечитываем одной выборкой
+        qs = CleaningTime.objects.filter(room_id__in=room_ids, date=d).order_by("room__room_number")
+        return Response({"date": str(d), "items": compact_rows(qs, CLEANING_COLUMNS)})
+
     @action(detail=True, methods=["delete"], url_path="cleanings")
     def delete_cleaning(self, request, pk=None):
-        hotel = request.user.profile.hotel
+        hotel = getattr(request_profile(request), "hotel", None)
         if not hotel:
             return Response({"detail": "profile.hotel is not set for cleaner"}, status=400)
 
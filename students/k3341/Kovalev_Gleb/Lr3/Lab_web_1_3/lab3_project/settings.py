@@ -88,6 +88,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "lab3-cache",
+    }
+}
+
+# TTL (сек) закэшированных векторов free_rooms; записи броней сбрасывают кэш сами
+AVAILABILITY_CACHE_TTL = 300
+# TTL (сек) сводки /api/admin/dashboard/ по отелю, сбрасывается только по времени
+DASHBOARD_CACHE_TTL = 30
+# TTL (сек) кэша токен-аутентификации (user + profile + hotel/staff/client), 0 — выключен.
+# Правки User/Profile/Token сбрасывают его сразу, правки Hotel/Staff/Client видны через TTL
+AUTH_TOKEN_CACHE_TTL = 0
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -131,7 +150,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "lab3_app.authentication.ProfileTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -157,4 +176,11 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 ]
 
 MEDIA_URL = "/media/"
-MEDIA_ROOT = Path(BASE_DIR) / "media"
\ No newline at end of file
+MEDIA_ROOT = Path(BASE_DIR) / "media"
+
+# absolute_image_url (lab3_app/images.py): LRU по (имя файла, хост, вариант)
+IMAGE_URL_CACHE_SIZE = 1024
+# если задан — картинки отдаются с CDN: IMAGE_CDN_URL + имя файла в storage
+IMAGE_CDN_URL = None
+# варианты по ?image_variant=...: шаблон от готового url/имени, например {"thumb": "{url}?w=320"}
+IMAGE_VARIANTS = {}
\ No newline at end of file